@@ -0,0 +1,287 @@
+"""Command line interface
+
+Only argparse is imported at startup, every command imports what it needs.
+
+    python -m yolo_dataset_tools convert config.yaml
+    python -m yolo_dataset_tools subset config.yaml
+    python -m yolo_dataset_tools stats dataset/
+    python -m yolo_dataset_tools validate dataset/
+
+Config example:
+
+    convert:
+      format: yolo-obb
+      output: datasets/yolo
+      link_mode: hardlink
+      splits:
+        train: {json: coco/instances_train.json, images: coco/images}
+        val: {json: coco/instances_val.json, images: coco/images}
+      resize: {size: 1280}  # tiling is only supported by subset
+
+    subset:
+      dataset: datasets/yolo
+      output: datasets/yolo_cars
+      filters:  # optional with sampling, resize or tiling
+        - class: {allowed_classes: [car]}
+        - orientation: {orientation: landscape}
+        - box_size: {size_ranges: [{class_name: car, wn_min: 0.01}]}
+      tiling: {tile_size: 1024, stride: 768}
+      cache: {cache_path: .cache/filters.db, max_entries: 1000000}
+
+Class-balanced sampling (not with tiling), filters are optional:
+
+    subset:
+      dataset: datasets/yolo
+      output: datasets/yolo_balanced
+      sampling: {quotas: {car: 20000}, default_quota: 5000, seed: 0}
+
+or with a target distribution instead of quotas:
+
+      sampling: {total: 100000, distribution: {car: 0.5, truck: 0.5}}
+
+COCO files, datasets and subsets in S3-compatible storage (requires boto3),
+in convert or subset, paths are keys relative to the bucket prefix,
+transforms are not supported:
+
+      storage: {s3: {bucket: data, prefix: datasets, endpoint_url: http://minio:9000}}
+
+Several subsets in one pass over the dataset, instead of output and filters:
+
+    subset:
+      dataset: datasets/yolo
+      subsets:
+        cars: {output: datasets/cars, filters: [class: {allowed_classes: [car]}]}
+        portrait:
+          output: datasets/portrait
+          filters: [orientation: {orientation: portrait}]
+"""
+
+import argparse
+import sys
+from typing import Any, Dict, List
+
+
+def _load_config(config_path: str, section: str) -> Dict[str, Any]:
+    import yaml
+
+    with open(config_path, "r", encoding="utf-8") as fp:
+        config = yaml.safe_load(fp) or {}
+    if section not in config:
+        raise KeyError(f"Section '{section}' not found in {config_path}")
+    return config[section]
+
+
+def _build_transforms(config: Dict[str, Any]) -> Dict[str, Any]:
+    """resize and tiling config sections to transform objects"""
+
+    transforms = {}
+    if "resize" in config:
+        from .transforms import ResizeTransform
+
+        transforms["transform"] = ResizeTransform(**config["resize"])
+    if "tiling" in config:
+        from .transforms import TileTransform
+
+        transforms["tiling"] = TileTransform(**config["tiling"])
+    return transforms
+
+
+def _build_filters(filters_config: List[Dict[str, Any]]) -> List[Any]:
+    from .dataset_filters import (
+        AbsBoxSizeRanges,
+        BoxSizeFilter,
+        ClassFilter,
+        OrientationFilter,
+        RelBoxSizeRanges,
+    )
+
+    def box_size_filter(size_ranges: List[Dict[str, Any]]) -> BoxSizeFilter:
+        return BoxSizeFilter(
+            [
+                (
+                    AbsBoxSizeRanges(**size_range)
+                    if any(key.endswith("_px_min") for key in size_range)
+                    or any(key.endswith("_px_max") for key in size_range)
+                    else RelBoxSizeRanges(**size_range)
+                )
+                for size_range in size_ranges
+            ]
+        )
+
+    factories = {
+        "class": ClassFilter,
+        "orientation": OrientationFilter,
+        "box_size": box_size_filter,
+    }
+    filters = []
+    for filter_config in filters_config:
+        ((name, params),) = filter_config.items()
+        if name not in factories:
+            raise KeyError(
+                f"Unknown filter '{name}', available: {list(factories)}"
+            )
+        filters.append(factories[name](**params))
+    return filters
+
+
+def _build_sampler(config: Dict[str, Any]) -> Any:
+    if "sampling" not in config:
+        return None
+
+    from .sampling import ClassBalancedSampler
+
+    params = dict(config["sampling"])
+    if "distribution" in params:
+        return ClassBalancedSampler.from_distribution(
+            params.pop("total"), params.pop("distribution"), **params
+        )
+    return ClassBalancedSampler(**params)
+
+
+def _build_filemanager(config: Dict[str, Any]) -> Any:
+    if "storage" not in config:
+        return None
+
+    from .filemanager import FileManager
+    from .storage import S3Storage
+
+    ((name, params),) = config["storage"].items()
+    if name != "s3":
+        raise KeyError(f"Unknown storage '{name}', available: ['s3']")
+    return FileManager(storage=S3Storage(**params))
+
+
+def convert(args: argparse.Namespace) -> int:
+    from .converter.multisplit import CocoSplit, MultiSplitCoco2YoloConverter
+
+    config = _load_config(args.config, "convert")
+    if "tiling" in config:
+        raise KeyError(
+            "Tiling is not supported by 'convert', use it in 'subset'"
+        )
+    converter = MultiSplitCoco2YoloConverter(
+        yolo_dataset_type=config.get("format", "yolo"),
+        yolo_dataset_path=config["output"],
+        splits=[
+            CocoSplit(
+                name=name,
+                json_path=split["json"],
+                images_path=split["images"],
+            )
+            for name, split in config["splits"].items()
+        ],
+        link_mode=config.get("link_mode", "copy"),
+        max_workers=config.get("max_workers"),
+        transform=_build_transforms(config).get("transform"),
+        filemanager=_build_filemanager(config),
+    )
+    converter.run()
+    return 0
+
+
+def subset(args: argparse.Namespace) -> int:
+    from .subdataset_builder import SubDatasetBuilder
+
+    config = _load_config(args.config, "subset")
+    cache = None
+    if "cache" in config:
+        from .filter_cache import FilterCache
+
+        cache = FilterCache(**config["cache"])
+    try:
+        _build_subsets(
+            SubDatasetBuilder(
+                config["dataset"],
+                cache=cache,
+                filemanager=_build_filemanager(config),
+            ),
+            config,
+        )
+    finally:
+        if cache:
+            cache.close()
+    return 0
+
+
+def _build_subsets(builder: Any, config: Dict[str, Any]) -> None:
+    if "subsets" in config:
+        # several subsets in one pass over the dataset
+        for name, subset_config in config["subsets"].items():
+            builder.add_subset(
+                name,
+                subset_config["output"],
+                _build_filters(subset_config.get("filters", [])),
+                sampler=_build_sampler(subset_config),
+            )
+        builder.build_subsets(
+            max_workers=config.get("max_workers"),
+            **_build_transforms(config),
+        )
+        return
+
+    for filter in _build_filters(config.get("filters", [])):
+        builder.add_filter(filter)
+    builder.build_subset(
+        config["output"],
+        max_workers=config.get("max_workers"),
+        sampler=_build_sampler(config),
+        **_build_transforms(config),
+    )
+
+
+def stats(args: argparse.Namespace) -> int:
+    from .dataset_stats import collect_statistics
+
+    print(collect_statistics(args.dataset))
+    return 0
+
+
+def validate(args: argparse.Namespace) -> int:
+    from .validator import DatasetValidator
+
+    report = DatasetValidator(args.dataset).validate()
+    print(report)
+    return 0 if report.is_valid else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m yolo_dataset_tools",
+        description="A lightweight set of tools for working with YOLO datasets",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_convert = commands.add_parser(
+        "convert", help="convert COCO files to a YOLO dataset"
+    )
+    parser_convert.add_argument("config", help="YAML config with 'convert'")
+    parser_convert.set_defaults(handler=convert)
+
+    parser_subset = commands.add_parser(
+        "subset", help="build a filtered dataset subset"
+    )
+    parser_subset.add_argument("config", help="YAML config with 'subset'")
+    parser_subset.set_defaults(handler=subset)
+
+    parser_stats = commands.add_parser(
+        "stats", help="images, labels and class instances counts"
+    )
+    parser_stats.add_argument("dataset", help="YOLO dataset directory")
+    parser_stats.set_defaults(handler=stats)
+
+    parser_validate = commands.add_parser(
+        "validate", help="check dataset integrity"
+    )
+    parser_validate.add_argument("dataset", help="YOLO dataset directory")
+    parser_validate.set_defaults(handler=validate)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
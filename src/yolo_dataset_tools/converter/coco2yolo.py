@@ -1,10 +1,22 @@
+from __future__ import annotations
+
 import math
 from pathlib import Path
-from tqdm import tqdm
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
-from ..models.coco import *
+from ..filemanager import FileManager
 from ..filemanager import filemanager as fm
+from ..models.yolo import ImageInfo
+
+
+# heavy dependencies (pydantic, tqdm, numpy) are imported on first use
+if TYPE_CHECKING:
+    from ..models.coco import Annotation, Image
+    from ..transforms.base import BaseTransform, TransformTask
+
+
+# {image_id: [(coco_class_id, "{x} {y} ..."), ...]}
+RawYoloAnnotations = Dict[int, List[Tuple[int, str]]]
 
 
 class Coco2YoloConverter:
@@ -18,12 +30,26 @@ class Coco2YoloConverter:
         input_images_path: str | Path,
         output_labels_path: str | Path,
         output_images_path: str | Path,
+        progress: bool = True,
+        transform: BaseTransform = None,
+        max_workers: int = None,
+        filemanager: FileManager = None,
     ):
+        """
+        :param transform: optional images and labels transform (e.g. ResizeTransform),
+        images are copied as is if not set
+        :param max_workers: transform process pool size
+        :param filemanager: COCO files and dataset storage, e.g.
+        FileManager(storage=S3Storage(...)), local files if not set
+        """
 
         if yolo_dataset_type not in self.YOLO_FORMATS:
             raise TypeError(
                 f"Supported yolo dataset formats: {self.YOLO_FORMATS}"
             )
+        self.fm = filemanager or fm
+        if transform and not self.fm.is_local:
+            raise ValueError("Transform requires local storage")
 
         self.yolo_dataset_type = yolo_dataset_type
         self.yolo_dataset_path = Path(yolo_dataset_path)
@@ -31,22 +57,58 @@ class Coco2YoloConverter:
         self.input_images_path = Path(input_images_path)
         self.output_labels_path = Path(output_labels_path)
         self.output_images_path = Path(output_images_path)
-        fm.create_dir(output_images_path, exist_ok=True)
-        fm.create_dir(output_labels_path, exist_ok=True)
+        self.progress = progress
+        self.transform = transform
+        self.max_workers = max_workers
+        self.fm.create_dir(output_images_path, exist_ok=True)
+        self.fm.create_dir(output_labels_path, exist_ok=True)
 
     def run(self):
         classes, annotations, images = self._load_coco_dataset()
+        names, (class_map,) = self.build_class_map([classes])
         yolo_annotations = self._convert(annotations, images)
-        self._save_yolo_dataset(classes, images, yolo_annotations)
+        self._save_yolo_dataset(names, class_map, images, yolo_annotations)
+
+    @staticmethod
+    def build_class_map(
+        classes_list: List[Dict[int, str]],
+    ) -> Tuple[List[str], List[Dict[int, int]]]:
+        """
+        Shared class map for one or several COCO files.
+        Class ids of a COCO file are not required to be contiguous or to
+        start from 1: classes are matched by name, yolo ids are assigned
+        in order of first appearance (files in given order, ids ascending).
+
+        :param classes_list: [{coco_class_id: class_name}, ...] per file
+        :return: (yolo class names, [{coco_class_id: yolo_class_id}, ...])
+        """
+
+        names: List[str] = []
+        yolo_ids: Dict[str, int] = {}
+        for classes in classes_list:
+            for class_id in sorted(classes):
+                name = classes[class_id]
+                if name not in yolo_ids:
+                    yolo_ids[name] = len(names)
+                    names.append(name)
+
+        class_maps = [
+            {class_id: yolo_ids[name] for class_id, name in classes.items()}
+            for classes in classes_list
+        ]
+        return names, class_maps
 
     def _load_coco_dataset(self) -> Tuple[
         Dict[int, str],
         List[Annotation],
         Dict[int, Image],
     ]:
-        with open(self.input_json_path, "r") as fp:
-            coco_data = COCO.model_validate_json(fp.read())
-        classes: Dict[int, Class] = {}
+        from ..models.coco import COCO
+
+        coco_data = COCO.model_validate_json(
+            self.fm.read_bytes(self.input_json_path)
+        )
+        classes: Dict[int, str] = {}
         for _class in coco_data.classes:
             classes[_class.id] = _class.name
         images: Dict[int, Image] = {}
@@ -58,30 +120,46 @@ class Coco2YoloConverter:
         self,
         annotations: List[Annotation],
         images: Dict[int, Image],
-    ) -> Dict[int, List[str]]:
-        yolo_annotations: Dict[int, List[str]] = {}
+    ) -> RawYoloAnnotations:
+        """Class ids are kept as is, see `_format_labels`"""
+
+        from tqdm import tqdm
+
+        yolo_annotations: RawYoloAnnotations = {}
         for annotation in tqdm(
             iterable=annotations,
             desc="Converting",
             leave=True,
             position=0,
+            disable=not self.progress,
         ):
             yolo_bbox = self._get_bbox(
                 annotation.bbox,
                 images[annotation.image_id].width,
                 images[annotation.image_id].height,
+                annotation.attributes.rotation,
             )
             yolo_annotations.setdefault(annotation.image_id, []).append(
-                f"{annotation.class_id - 1} {" ".join(map(str, yolo_bbox))}"
+                (annotation.class_id, " ".join(map(str, yolo_bbox)))
             )
         return yolo_annotations
 
+    @staticmethod
+    def _format_labels(
+        image_annotations: List[Tuple[int, str]],
+        class_map: Dict[int, int],
+    ) -> List[str]:
+        return [
+            f"{class_map[class_id]} {bbox}"
+            for class_id, bbox in image_annotations
+        ]
+
     def _get_bbox(
         self,
         coco_bbox: List[float],
         image_w: float,
         image_h: float,
-        box_rotation_deg: float,
+        box_rotation_deg: float = 0.0,
     ) -> List[float]:
         x0, y0, box_w, box_h = coco_bbox
         if self.yolo_dataset_type == "yolo":
@@ -100,7 +178,7 @@ class Coco2YoloConverter:
                 (box_w / 2, box_h / 2),  # bottom-right
                 (-box_w / 2, box_h / 2),  # bottom-left
             ]
-            yolo_bbox = []
+            bbox = []
             box_rotation_rad = math.radians(box_rotation_deg)
             cos_a = math.cos(box_rotation_rad)
             sin_a = math.sin(box_rotation_rad)
@@ -109,36 +187,74 @@ class Coco2YoloConverter:
                 y_rot = sin_a * x + cos_a * y + cy
                 x_norm = x_rot / image_w
                 y_norm = y_rot / image_h
-                yolo_bbox.extend([x_norm, y_norm])
-        return yolo_bbox
+                bbox.extend([x_norm, y_norm])
+        return bbox
 
     def _save_yolo_dataset(
         self,
-        classes: Dict[int, str],
+        names: List[str],
+        class_map: Dict[int, int],
         images: Dict[int, Image],
-        yolo_annotations: Dict[int, List[str]],
+        yolo_annotations: RawYoloAnnotations,
     ) -> None:
         # create classes.txt
-        with open(f"{self.yolo_dataset_path}/classes.txt", "w") as fp:
-            for i in range(len(classes)):
-                fp.write(f"{classes[i + 1]}\n")
+        self.fm.create_dir(self.yolo_dataset_path)
+        self.fm.write_text(
+            self.yolo_dataset_path / "classes.txt",
+            "".join(f"{name}\n" for name in names),
+        )
+
+        if self.transform:
+            return self._transform_yolo_dataset(
+                class_map, images, yolo_annotations
+            )
+
+        from tqdm import tqdm
 
-        count = 0
         for image_id, annotation in tqdm(
             iterable=yolo_annotations.items(),
             desc="Saving",
             leave=True,
             position=0,
+            disable=not self.progress,
         ):
-            count += 1
             # copy image
             image_filename = Path(images[image_id].file_name)
-            fm.copy_file(
+            self.fm.copy_file(
                 self.input_images_path / image_filename,
                 self.output_images_path / image_filename,
             )
             # create label text file
             label_filename = f"{image_filename.stem}.txt"
-            with open(self.output_labels_path / label_filename, "w") as fp:
-                for line in annotation:
-                    fp.writelines(f"{line}\n")
+            self.fm.write_text(
+                self.output_labels_path / label_filename,
+                "".join(
+                    f"{line}\n"
+                    for line in self._format_labels(annotation, class_map)
+                ),
+            )
+
+    def _transform_yolo_dataset(
+        self,
+        class_map: Dict[int, int],
+        images: Dict[int, Image],
+        yolo_annotations: RawYoloAnnotations,
+    ) -> None:
+        tasks: List[TransformTask] = []
+        for image_id, annotation in yolo_annotations.items():
+            image = images[image_id]
+            image_filename = Path(image.file_name)
+            tasks.append(
+                (
+                    self.input_images_path / image_filename,
+                    ImageInfo(width=image.width, height=image.height),
+                    [
+                        (
+                            self._format_labels(annotation, class_map),
+                            self.output_images_path / image_filename.parent,
+                            self.output_labels_path,
+                        )
+                    ],
+                )
+            )
+        self.transform.apply_many(tasks, self.max_workers)
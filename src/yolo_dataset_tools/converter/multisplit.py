@@ -0,0 +1,277 @@
+"""MultiSplitCoco2YoloConverter"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from .coco2yolo import Coco2YoloConverter
+from ..filemanager import FileManager
+from ..filemanager import filemanager as fm
+from ..models.yolo import DatasetInfo, ImageInfo
+
+if TYPE_CHECKING:
+    from ..transforms.base import BaseTransform, TransformTask
+
+
+@dataclass
+class CocoSplit:
+    name: str
+    json_path: str | Path
+    images_path: str | Path
+
+
+# (classes, {image_file_name: (ImageInfo, [(coco_class_id, "{x} {y} ..."), ...])})
+SplitResult = Tuple[
+    Dict[int, str],
+    Dict[str, Tuple[ImageInfo, List[Tuple[int, str]]]],
+]
+
+
+def _load_and_convert(
+    yolo_dataset_type: str,
+    yolo_dataset_path: Path,
+    split: CocoSplit,
+    filemanager: FileManager,
+) -> SplitResult:
+    """Process pool worker: COCO json parsing and boxes conversion"""
+
+    converter = Coco2YoloConverter(
+        yolo_dataset_type=yolo_dataset_type,
+        yolo_dataset_path=yolo_dataset_path,
+        input_json_path=split.json_path,
+        input_images_path=split.images_path,
+        output_labels_path=yolo_dataset_path / "labels" / split.name,
+        output_images_path=yolo_dataset_path / "images" / split.name,
+        progress=False,
+        filemanager=filemanager,
+    )
+    classes, annotations, images = converter._load_coco_dataset()
+    yolo_annotations = converter._convert(annotations, images)
+    return classes, {
+        images[image_id].file_name: (
+            ImageInfo(
+                width=images[image_id].width,
+                height=images[image_id].height,
+            ),
+            image_annotations,
+        )
+        for image_id, image_annotations in yolo_annotations.items()
+    }
+
+
+class MultiSplitCoco2YoloConverter:
+    """
+    ### Several COCO files to one YOLO dataset
+
+    COCO files are parsed and converted concurrently in a process pool,
+    classes are merged by name into one class map, then labels and images
+    of all splits are saved in one shared I/O stage.
+
+    Output dataset schema:
+
+    dataset/
+        ├── images/
+        │   ├── train/
+        │   ├── val/
+        │   └── test/
+        ├── labels/
+        │   └── ...
+        ├── classes.txt
+        └── data.yaml
+    """
+
+    SPLITS = ("train", "val", "test")
+
+    def __init__(
+        self,
+        yolo_dataset_type: str,
+        yolo_dataset_path: str | Path,
+        splits: List[CocoSplit],
+        link_mode: str = "copy",
+        max_workers: int = None,
+        transform: BaseTransform = None,
+        filemanager: FileManager = None,
+    ):
+        """
+        :param splits: one CocoSplit per COCO file, split names must be unique
+        :param link_mode: how images are materialized, one of FileManager.LINK_MODES
+        :param max_workers: process pool and I/O thread pool size
+        :param transform: optional images and labels transform (e.g. ResizeTransform),
+        applied instead of link_mode materialization
+        :param filemanager: COCO files and dataset storage, e.g.
+        FileManager(storage=S3Storage(...)), local files if not set. Remote
+        storages copy images server-side whatever link_mode is
+        """
+
+        if yolo_dataset_type not in Coco2YoloConverter.YOLO_FORMATS:
+            raise TypeError(
+                "Supported yolo dataset formats: "
+                f"{Coco2YoloConverter.YOLO_FORMATS}"
+            )
+        if not splits:
+            raise ValueError("Splits list is empty")
+        split_names = [split.name for split in splits]
+        if len(set(split_names)) != len(split_names):
+            raise ValueError(f"Duplicate split names: {split_names}")
+        unknown = set(split_names) - set(self.SPLITS)
+        if unknown:
+            raise ValueError(
+                f"Unknown splits {sorted(unknown)}, supported: {self.SPLITS}"
+            )
+        if link_mode not in fm.LINK_MODES:
+            raise ValueError(f"Link mode must be one of {fm.LINK_MODES}")
+        self.fm = filemanager or fm
+        if transform and not self.fm.is_local:
+            raise ValueError("Transform requires local storage")
+
+        self.yolo_dataset_type = yolo_dataset_type
+        self.yolo_dataset_path = self.fm.resolve_path(yolo_dataset_path)
+        self.splits = splits
+        self.link_mode = link_mode
+        self.max_workers = max_workers
+        self.transform = transform
+
+    def run(self) -> DatasetInfo:
+        self.fm.create_dir(self.yolo_dataset_path)
+        results = self._convert_splits()
+        names, class_maps = Coco2YoloConverter.build_class_map(
+            [classes for classes, _ in results]
+        )
+
+        tasks = []
+        for split, (_, annotations), class_map in zip(
+            self.splits, results, class_maps
+        ):
+            for file_name, (
+                image_info,
+                image_annotations,
+            ) in annotations.items():
+                tasks.append(
+                    (
+                        split,
+                        file_name,
+                        image_info,
+                        Coco2YoloConverter._format_labels(
+                            image_annotations, class_map
+                        ),
+                    )
+                )
+        if self.transform:
+            self._transform_images_and_labels(tasks)
+        else:
+            self._save_images_and_labels(tasks)
+
+        dataset_info = self._dump_dataset_metadata(names)
+        print(f"{len(tasks)} images saved to {self.yolo_dataset_path}")
+        return dataset_info
+
+    def _convert_splits(self) -> List[SplitResult]:
+        from tqdm import tqdm
+
+        max_workers = self.max_workers or min(
+            len(self.splits), os.cpu_count() or 1
+        )
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return list(
+                tqdm(
+                    pool.map(
+                        _load_and_convert,
+                        repeat(self.yolo_dataset_type),
+                        repeat(self.yolo_dataset_path),
+                        self.splits,
+                        repeat(self.fm),
+                    ),
+                    total=len(self.splits),
+                    desc="Converting",
+                    leave=True,
+                )
+            )
+
+    def _save_images_and_labels(
+        self,
+        tasks: List[Tuple[CocoSplit, str, ImageInfo, List[str]]],
+    ) -> None:
+        from tqdm import tqdm
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for _ in tqdm(
+                pool.map(self._save_image_and_label, tasks),
+                total=len(tasks),
+                desc="Saving",
+                leave=True,
+            ):
+                pass
+
+    def _save_image_and_label(
+        self,
+        task: Tuple[CocoSplit, str, ImageInfo, List[str]],
+    ) -> None:
+        split, file_name, _, lines = task
+        image_filename = Path(file_name)
+        self.fm.link_file(
+            src=Path(split.images_path) / image_filename,
+            dst=self.yolo_dataset_path
+            / "images"
+            / split.name
+            / image_filename,
+            mode=self.link_mode,
+        )
+        label_path = (
+            self.yolo_dataset_path
+            / "labels"
+            / split.name
+            / image_filename.with_suffix(".txt")
+        )
+        self.fm.create_dir(label_path.parent)
+        self.fm.write_text(label_path, "".join(f"{line}\n" for line in lines))
+
+    def _transform_images_and_labels(
+        self,
+        tasks: List[Tuple[CocoSplit, str, ImageInfo, List[str]]],
+    ) -> None:
+        transform_tasks: List[TransformTask] = []
+        for split, file_name, image_info, lines in tasks:
+            image_filename = Path(file_name)
+            transform_tasks.append(
+                (
+                    Path(split.images_path) / image_filename,
+                    image_info,
+                    [
+                        (
+                            lines,
+                            self.yolo_dataset_path
+                            / "images"
+                            / split.name
+                            / image_filename.parent,
+                            self.yolo_dataset_path
+                            / "labels"
+                            / split.name
+                            / image_filename.parent,
+                        )
+                    ],
+                )
+            )
+        self.transform.apply_many(transform_tasks, self.max_workers)
+
+    def _dump_dataset_metadata(self, names: List[str]) -> DatasetInfo:
+        split_names = [split.name for split in self.splits]
+        dataset_info = DatasetInfo(
+            *[
+                f"images/{name}" if name in split_names else ""
+                for name in self.SPLITS
+            ],
+            nc=len(names),
+            names=names,
+        )
+        self.fm.write_text(
+            self.yolo_dataset_path / "data.yaml", str(dataset_info)
+        )
+        self.fm.write_text(
+            self.yolo_dataset_path / "classes.txt", "\n".join(names)
+        )
+        return dataset_info
@@ -1,23 +1,15 @@
 """BaseFilter"""
 
 from abc import ABC, abstractmethod
+import hashlib
+import json
 from typing import Any, Dict, List
 
 from ..models.yolo import DatasetInfo, ImageInfo
 
 
 class BaseFilter(ABC):
-    """if need object with last call parameters comment raise line"""
-
-    _instances = dict()
-
-    def __new__(cls, *args, **kwargs):
-        if cls in cls._instances:
-            raise RuntimeError(f"Instance of {cls.__name__} already exists")
-            # return cls._instances[cls]  # object with last call parameters
-        instance = super().__new__(cls)
-        cls._instances[cls] = instance
-        return cls._instances[cls]
+    """One instance per filter chain, rules are set by the chain dataset info"""
 
     @abstractmethod
     def set_rules(self, dataset_info: DatasetInfo) -> None:
@@ -31,23 +23,22 @@ class BaseFilter(ABC):
     def apply(self, annotation: List[str], image_info: ImageInfo) -> List[str]:
         pass
 
-
-# Singleton
-# from abc import ABCMeta
-
-# class MetaFilterSingleton(ABCMeta):
-#     """if need object with first call parameters comment raise line"""
-
-#     _instances = dict()
-
-#     def __call__(cls, *args, **kwargs):
-#         if cls in cls._instances:
-#             raise RuntimeError(f"Instance of {cls.__name__} already exists")
-#             # return cls._instances[cls]
-#         instance = super().__call__(*args, **kwargs)
-#         cls._instances[cls] = instance
-#         return cls._instances[cls]
-
-
-# class BaseFilter(ABC, metaclass=MetaFilterSingleton):
-#     ...
+    def get_config(self) -> Dict[str, Any] | None:
+        """
+        JSON serializable filter parameters, None if the filter results
+        must not be cached
+        """
+        return None
+
+    def config_hash(self) -> str | None:
+        """Stable hash of the filter class and parameters"""
+
+        config = self.get_config()
+        if config is None:
+            return None
+        return hashlib.sha1(
+            json.dumps(
+                {"filter": type(self).__name__, "config": config},
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
@@ -1,8 +1,8 @@
 """ClassFilter"""
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 import math
-from typing import Dict, List, Tuple, Union
+from typing import Any, Dict, List, Tuple, Union
 
 from .base import BaseFilter
 from ..models.yolo import DatasetInfo, ImageInfo
@@ -96,6 +96,14 @@ class BoxSizeFilter(BaseFilter):
             self.rules[class_dict[size_range.class_name]] = size_range
         self.rule_classes_ids = self.rules.keys()
 
+    def get_config(self) -> Dict[str, Any]:
+        return {
+            "size_ranges": [
+                {"type": type(sr).__name__, **asdict(sr)}
+                for sr in self.size_ranges
+            ]
+        }
+
     def transform_dataset_info(self, dataset_info: DatasetInfo) -> DatasetInfo:
         return dataset_info
 
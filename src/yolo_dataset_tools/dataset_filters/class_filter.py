@@ -1,6 +1,6 @@
 """ClassFilter"""
 
-from typing import List
+from typing import Any, Dict, List
 
 from .base import BaseFilter
 from ..models.yolo import DatasetInfo, ImageInfo
@@ -29,6 +29,9 @@ class ClassFilter(BaseFilter):
             self.allowed_orig_classes_ids.append(orig_classes_dict[name])
             self.rules[orig_classes_dict[name]] = class_id
 
+    def get_config(self) -> Dict[str, Any]:
+        return {"allowed_classes": list(self.allowed_classes)}
+
     def transform_dataset_info(self, dataset_info: DatasetInfo) -> DatasetInfo:
         dataset_info.nc = len(self.allowed_classes)
         dataset_info.names = self.allowed_classes
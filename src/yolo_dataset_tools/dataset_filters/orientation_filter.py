@@ -1,6 +1,6 @@
 """OrientationFilter"""
 
-from typing import List
+from typing import Any, Dict, List
 
 from .base import BaseFilter
 from ..models.yolo import DatasetInfo, ImageInfo
@@ -27,6 +27,9 @@ class OrientationFilter(BaseFilter):
     def set_rules(self, dataset_info: DatasetInfo) -> None:
         pass
 
+    def get_config(self) -> Dict[str, Any]:
+        return {"orientation": self.orientation}
+
     def transform_dataset_info(self, dataset_info: DatasetInfo) -> DatasetInfo:
         return dataset_info
 
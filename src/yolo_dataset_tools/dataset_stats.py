@@ -0,0 +1,79 @@
+"""DatasetStatistics"""
+
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+from typing import Dict
+
+from .filemanager import filemanager as fm
+from .subdataset_builder import SubDatasetBuilder
+
+
+@dataclass
+class DatasetStatistics:
+    images: int = 0
+    labels: int = 0
+    empty_labels: int = 0
+    instances: Dict[str, int] = field(default_factory=dict)
+    images_per_class: Dict[str, int] = field(default_factory=dict)
+
+    def __repr__(self):
+        width = max([len(name) for name in self.instances] + [5])
+        lines = [
+            f"images: {self.images}",
+            f"labels: {self.labels}",
+            f"empty labels: {self.empty_labels}",
+            "",
+            f"{'class':<{width}} {'instances':>10} {'images':>10}",
+        ]
+        for name, count in self.instances.items():
+            lines.append(
+                f"{name:<{width}} {count:>10} "
+                f"{self.images_per_class.get(name, 0):>10}"
+            )
+        return "\n".join(lines)
+
+
+def collect_statistics(dataset_path: str | Path) -> DatasetStatistics:
+    """
+    Labels are read as text only, images are not opened.
+    Split subdirectories (images/train, ...) are counted together
+    :param dataset_path: directory with images, labels and classes.txt or data.yaml
+    """
+
+    dataset_path = fm.resolve_path(dataset_path)
+    names = SubDatasetBuilder.load_dataset_info(dataset_path).names
+    stats = DatasetStatistics(
+        images=sum(
+            len(filenames)
+            for _, _, filenames in os.walk(dataset_path / "images")
+        ),
+        instances={name: 0 for name in names},
+        images_per_class={name: 0 for name in names},
+    )
+    for root, _, filenames in os.walk(dataset_path / "labels"):
+        for filename in filenames:
+            if not filename.endswith(".txt"):
+                continue
+            stats.labels += 1
+            image_classes = set()
+            with open(os.path.join(root, filename), "r") as fp:
+                for line in fp:
+                    values = line.split()
+                    if not values:
+                        continue
+                    class_id = int(values[0])
+                    name = (
+                        names[class_id]
+                        if 0 <= class_id < len(names)
+                        else f"#{class_id}"
+                    )
+                    stats.instances[name] = stats.instances.get(name, 0) + 1
+                    image_classes.add(name)
+            if not image_classes:
+                stats.empty_labels += 1
+            for name in image_classes:
+                stats.images_per_class[name] = (
+                    stats.images_per_class.get(name, 0) + 1
+                )
+    return stats
@@ -1,19 +1,29 @@
 import os
 import shutil
 from pathlib import Path
+from typing import List, Sequence, Tuple
+
+from .storage import LocalStorage, StorageBackend
 
 
 class FileManager:
-    def __init__(self, base_dir: str = None):
-        self.base_dir = Path(base_dir).resolve() if base_dir else None
+    LINK_MODES = ("copy", "hardlink", "symlink")
+
+    def __init__(self, base_dir: str = None, storage: StorageBackend = None):
+        """
+        :param storage: files backend, LocalStorage if not set
+        (e.g. S3Storage for a bucket)
+        """
+
+        self.storage = storage or LocalStorage()
+        self.base_dir = self.storage.resolve(base_dir) if base_dir else None
+
+    @property
+    def is_local(self) -> bool:
+        return self.storage.is_local
 
     def resolve_path(self, path: str | Path) -> Path:
-        path = Path(path)
-        return (
-            (self.base_dir / path).resolve()
-            if self.base_dir
-            else path.resolve()
-        )
+        return self.storage.resolve(path, self.base_dir)
 
     def basename(self, path: str | Path):
         return path.split("/")[-1]
@@ -21,20 +31,23 @@ class FileManager:
     # ==== Dirs ====
 
     def is_dir(self, path: str | Path) -> bool:
-        return self.resolve_path(path).is_dir()
+        return self.storage.is_dir(self.resolve_path(path))
 
     def create_dir(self, path: str | Path, exist_ok: bool = True) -> Path:
         path = self.resolve_path(path)
-        path.mkdir(parents=True, exist_ok=exist_ok)
+        self.storage.make_dir(path, exist_ok=exist_ok)
         return path
 
     def clear_dir(self, path: str | Path) -> Path | None:
         path = self.resolve_path(path)
-        if path.exists():
-            shutil.rmtree(path)
+        if self.storage.exists(path):
+            self.storage.remove_dir(path)
             path = self.create_dir(path)
         return path
 
+    def list_dir(self, path: str | Path) -> List[str]:
+        return self.storage.list_dir(self.resolve_path(path))
+
     def move_dir(
         self,
         src: str | Path,
@@ -65,13 +78,58 @@ class FileManager:
 
     def remove_dir(self, path: str | Path):
         path = self.resolve_path(path)
-        if path.exists() and path.is_dir():
-            shutil.rmtree(path)
+        if self.storage.is_dir(path):
+            self.storage.remove_dir(path)
 
     # ==== Files ====
 
     def is_file(self, path: str | Path) -> bool:
-        return self.resolve_path(path).is_file()
+        return self.storage.is_file(self.resolve_path(path))
+
+    def read_bytes(self, path: str | Path) -> bytes:
+        return self.storage.read_bytes(self.resolve_path(path))
+
+    def read_text(self, path: str | Path, encoding: str = "utf-8") -> str:
+        return self.read_bytes(path).decode(encoding)
+
+    def write_text(
+        self,
+        path: str | Path,
+        text: str,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.storage.write_bytes(
+            self.resolve_path(path), text.encode(encoding)
+        )
+
+    def read_many(
+        self,
+        paths: Sequence[str | Path],
+        max_workers: int = None,
+    ) -> List[bytes | None]:
+        """
+        Batch read, concurrent for remote storages
+        :return: file contents in paths order, None for missing files
+        """
+
+        return self.storage.read_many(
+            [self.resolve_path(path) for path in paths], max_workers
+        )
+
+    def image_sizes(
+        self,
+        paths: Sequence[str | Path],
+        max_workers: int = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        Images are not decoded, remote storages read headers with
+        concurrent ranged requests
+        :return: [(width, height), ...] in paths order
+        """
+
+        return self.storage.image_sizes(
+            [self.resolve_path(path) for path in paths], max_workers
+        )
 
     def copy_file(
         self,
@@ -101,10 +159,44 @@ class FileManager:
             overwrite=overwrite,
         )
 
+    def link_file(
+        self,
+        src: str | Path,
+        dst: str | Path,
+        mode: str = "hardlink",
+        overwrite: bool = True,
+    ):
+        """
+        :param mode: one of LINK_MODES. Hardlink falls back to copy when
+        src and dst are on different devices, remote storages always copy
+        """
+
+        if mode not in self.LINK_MODES:
+            raise ValueError(f"Link mode must be one of {self.LINK_MODES}")
+        if mode == "copy" or not self.is_local:
+            return self.copy_file(
+                src, dst, auto_rename=False, overwrite=overwrite
+            )
+
+        src = self.resolve_path(src)
+        dst = self.resolve_path(dst)
+        if dst.exists() or dst.is_symlink():
+            if not overwrite:
+                raise FileExistsError(f"File {dst} already exists")
+            dst.unlink()
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if mode == "symlink":
+            dst.symlink_to(src)
+            return
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
     def remove_file(self, path: str | Path):
         path = self.resolve_path(path)
-        if path.exists() and path.is_file():
-            path.unlink()
+        if self.storage.is_file(path):
+            self.storage.remove_file(path)
 
     def _move(
         self,
@@ -115,13 +207,13 @@ class FileManager:
     ):
         src = self.resolve_path(src)
         dst = self.resolve_path(dst)
-        if dst.exists():
+        if self.storage.exists(dst):
             if auto_rename:
                 dst = self._increment_name(dst)
             elif not overwrite:
                 raise FileExistsError(f"File {dst} already exists")
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        shutil.move(src, dst)
+        self.storage.make_dir(dst.parent)
+        self.storage.move(src, dst)
 
     def _copy(
         self,
@@ -132,21 +224,18 @@ class FileManager:
     ):
         src = self.resolve_path(src)
         dst = self.resolve_path(dst)
-        if dst.exists():
+        # existence is not checked if dst is overwritten anyway
+        if (auto_rename or not overwrite) and self.storage.exists(dst):
             if auto_rename:
                 dst = self._increment_name(dst)
             elif not overwrite:
                 raise FileExistsError(f"File {dst} already exists")
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        if src.is_file():
-            shutil.copy2(src, dst)
-        else:
-            shutil.copytree(src, dst)
+        self.storage.make_dir(dst.parent)
+        self.storage.copy(src, dst)
 
-    @staticmethod
-    def _increment_name(path: str | Path) -> Path:
-        path = Path(path)
-        if not path.exists():
+    def _increment_name(self, path: str | Path) -> Path:
+        path = self.resolve_path(path)
+        if not self.storage.exists(path):
             return path
 
         stem = path.stem
@@ -158,7 +247,7 @@ class FileManager:
 
             new_name = f"{stem}({incr}){suffix}"
             new_path = parent / new_name
-            if not new_path.exists():
+            if not self.storage.exists(new_path):
                 return new_path
             incr += 1
 
@@ -0,0 +1,155 @@
+"""FilterCache"""
+
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+from typing import List, Sequence, Tuple
+
+from .filemanager import filemanager as fm
+from .models.yolo import ImageInfo
+
+
+def fingerprint(annotation_lines: Sequence[str]) -> str:
+    return hashlib.sha1("\n".join(annotation_lines).encode()).hexdigest()
+
+
+def chain_prefix_hashes(
+    root: str,
+    filters_hashes: Sequence[str | None],
+) -> List[str | None]:
+    """
+    :param root: hash of the filter chain input, e.g. dataset class names
+    :param filters_hashes: BaseFilter.config_hash() of every chain filter
+    :return: hash of every chain prefix, None from the first not hashable filter
+    """
+
+    prefix_hashes: List[str | None] = []
+    prefix = root
+    for filter_hash in filters_hashes:
+        if prefix is None or filter_hash is None:
+            prefix = None
+        else:
+            prefix = hashlib.sha1(
+                f"{prefix}|{filter_hash}".encode()
+            ).hexdigest()
+        prefix_hashes.append(prefix)
+    return prefix_hashes
+
+
+def dataset_hash(names: Sequence[str]) -> str:
+    return hashlib.sha1(json.dumps(list(names)).encode()).hexdigest()
+
+
+class FilterCache:
+    """
+    ### On-disk cache of filter chains outputs
+
+    Key: (filter chain prefix hash, input label fingerprint, image size),
+    value: annotation lines after the prefix filters. Chains sharing a
+    prefix share its entries, so after a change of the last filter only
+    this filter is recomputed. Least recently used entries are evicted
+    when the cache exceeds max_entries.
+    """
+
+    FLUSH_EVERY = 10000
+
+    def __init__(
+        self,
+        cache_path: str | Path,
+        max_entries: int = 5_000_000,
+    ) -> None:
+        """
+        :param cache_path: sqlite database file
+        :param max_entries: cache size limit
+        """
+
+        if max_entries <= 0:
+            raise ValueError("Max entries must be positive")
+
+        self.cache_path = fm.resolve_path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(self.cache_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT, last_access INTEGER)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access "
+            "ON entries (last_access)"
+        )
+        (self._tick,) = self._db.execute(
+            "SELECT COALESCE(MAX(last_access), 0) FROM entries"
+        ).fetchone()
+        self._accessed: List[Tuple[int, str]] = []
+        self._pending = 0
+
+    def __enter__(self) -> "FilterCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @staticmethod
+    def make_key(
+        prefix_hash: str,
+        label_fingerprint: str,
+        image_info: ImageInfo,
+    ) -> str:
+        return (
+            f"{prefix_hash}:{label_fingerprint}:"
+            f"{image_info.width}x{image_info.height}"
+        )
+
+    def get(self, key: str) -> Tuple[bool, List[str]]:
+        """:return: (hit, annotation lines), empty list for dropped annotations"""
+
+        row = self._db.execute(
+            "SELECT value FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, []
+        self.hits += 1
+        self._tick += 1
+        self._accessed.append((self._tick, key))
+        self._maybe_flush()
+        return True, row[0].split("\n") if row[0] else []
+
+    def put(self, key: str, annotation_lines: List[str] | None) -> None:
+        self._tick += 1
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+            (key, "\n".join(annotation_lines or []), self._tick),
+        )
+        self._pending += 1
+        self._maybe_flush()
+
+    def flush(self) -> None:
+        """Store access times, evict least recently used entries, commit"""
+
+        self._db.executemany(
+            "UPDATE entries SET last_access = ? WHERE key = ?",
+            self._accessed,
+        )
+        self._accessed = []
+        self._pending = 0
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        self._db.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
+
+    def _maybe_flush(self) -> None:
+        if self._pending + len(self._accessed) >= self.FLUSH_EVERY:
+            self.flush()
@@ -0,0 +1,222 @@
+"""ClassBalancedSampler"""
+
+import hashlib
+import heapq
+import math
+from typing import Any, Dict, List, Set, Tuple
+
+from .models.yolo import DatasetInfo
+
+
+IMAGES = "images"
+INSTANCES = "instances"
+UNIFORM = "uniform"
+
+
+class ClassBalancedSampler:
+    """
+    ### Streaming per-class quotas
+
+    Weighted reservoir sampling (Efraimidis-Spirakis A-Res): every image
+    is offered to the reservoir of each class it contains, a reservoir
+    keeps the images with the largest keys u ** (1 / weight) while their
+    number (IMAGES unit) or number of class instances (INSTANCES unit)
+    fits the quota. Random values u are derived from (seed, image id,
+    class id) instead of a random generator state, so the result does
+    not depend on the offer order and samplers of parallel shards can
+    be merged.
+
+    Memory is proportional to the sum of quotas. The selected subset is
+    the union of reservoirs: an image selected for one class also
+    contributes instances of its other classes.
+    """
+
+    available_units = (IMAGES, INSTANCES)
+    available_weightings = (UNIFORM, INSTANCES)
+
+    def __init__(
+        self,
+        quotas: Dict[str, int] = None,
+        default_quota: int = None,
+        unit: str = IMAGES,
+        weighting: str = UNIFORM,
+        seed: int = 0,
+    ) -> None:
+        """
+        :param quotas: max images or instances per class name,
+        {"class_name": 20000, ...}
+        :param default_quota: quota of classes missing in quotas,
+        None - such classes do not select images
+        :param unit: IMAGES or INSTANCES, what quotas limit
+        :param weighting: UNIFORM - every image has equal chances,
+        INSTANCES - image weight is the number of class instances in it
+        :param seed: random seed, samplers must have equal seeds to be merged
+        """
+
+        if unit not in self.available_units:
+            raise ValueError(f"Unit must be one of {self.available_units}")
+        if weighting not in self.available_weightings:
+            raise ValueError(
+                f"Weighting must be one of {self.available_weightings}"
+            )
+        quotas = quotas or {}
+        if (
+            quotas
+            and min(quotas.values()) < 0
+            or (default_quota is not None and default_quota < 0)
+        ):
+            raise ValueError("Quotas must be non-negative")
+        if not quotas and default_quota is None:
+            raise ValueError("Neither quotas nor default quota is set")
+
+        self.quotas = quotas
+        self.default_quota = default_quota
+        self.unit = unit
+        self.weighting = weighting
+        self.seed = seed
+        self.class_quotas: Dict[int, int] = {}
+        # {class_id: min-heap of (key, item_id, instances, payload)}
+        self.reservoirs: Dict[int, List[Tuple[float, str, int, Any]]] = {}
+        # {class_id: reservoir size in quota units}
+        self._sizes: Dict[int, int] = {}
+        # {class_id: reservoir item ids}
+        self._items: Dict[int, Set[str]] = {}
+        # {class_id: key of the last evicted entry}
+        self._cutoffs: Dict[int, float] = {}
+
+    @classmethod
+    def from_distribution(
+        cls,
+        total: int,
+        distribution: Dict[str, float],
+        **kwargs,
+    ) -> "ClassBalancedSampler":
+        """
+        :param total: target number of images or instances (see unit)
+        :param distribution: target class shares, {"class_name": 0.3, ...}
+        """
+
+        shares = sum(distribution.values())
+        if total <= 0 or shares <= 0:
+            raise ValueError("Total and distribution must be positive")
+        return cls(
+            quotas={
+                name: round(total * share / shares)
+                for name, share in distribution.items()
+            },
+            **kwargs,
+        )
+
+    def set_rules(self, dataset_info: DatasetInfo) -> None:
+        extra = set(self.quotas) - set(dataset_info.names)
+        if extra:
+            extra = ",".join(extra)
+            raise NameError(f"{extra} is not present in the output subset")
+
+        self.class_quotas = {}
+        self.reservoirs = {}
+        self._sizes, self._items, self._cutoffs = {}, {}, {}
+        for class_id, name in enumerate(dataset_info.names):
+            quota = self.quotas.get(name, self.default_quota)
+            if quota:
+                self.class_quotas[class_id] = quota
+
+    def offer(
+        self,
+        item_id: str,
+        annotation_lines: List[str],
+        payload: Any = None,
+    ) -> None:
+        """
+        :param item_id: unique and stable image id, e.g. image file name
+        :param annotation_lines: [ "{cls} {xc or x1} {yc or y1} ...", ... ]
+        :param payload: object returned by selected() for this image
+        """
+
+        instances: Dict[int, int] = {}
+        for line in annotation_lines:
+            class_id = int(line.split(maxsplit=1)[0])
+            instances[class_id] = instances.get(class_id, 0) + 1
+
+        for class_id, count in instances.items():
+            if class_id not in self.class_quotas:
+                continue
+            weight = count if self.weighting == INSTANCES else 1
+            key = math.log(self._random(item_id, class_id)) / weight
+            self._push(class_id, (key, item_id, count, payload))
+
+    def merge(self, other: "ClassBalancedSampler") -> "ClassBalancedSampler":
+        """Add reservoirs of a sampler of another shard of the same dataset"""
+
+        if (
+            other.seed != self.seed
+            or other.unit != self.unit
+            or other.weighting != self.weighting
+            or other.class_quotas != self.class_quotas
+        ):
+            raise ValueError("Samplers with different rules can not be merged")
+
+        for class_id, cutoff in other._cutoffs.items():
+            self._cutoffs[class_id] = max(
+                cutoff, self._cutoffs.get(class_id, -math.inf)
+            )
+            self._evict(class_id)
+        for class_id, other_reservoir in other.reservoirs.items():
+            for entry in other_reservoir:
+                self._push(class_id, entry)
+        return self
+
+    def selected(self) -> List[Tuple[str, Any]]:
+        """:return: [(item_id, payload), ...] ordered by item_id"""
+
+        items: Dict[str, Any] = {}
+        for reservoir in self.reservoirs.values():
+            for _, item_id, _, payload in reservoir:
+                items[item_id] = payload
+        return sorted(items.items(), key=lambda item: item[0])
+
+    def _push(self, class_id: int, entry: Tuple[float, str, int, Any]):
+        """
+        Reservoir keeps all entries with keys above the cutoff, the cutoff is
+        the key of the entry which makes the largest keys exceed the quota.
+        The result depends only on the set of offered entries, not on the
+        offer order
+        """
+
+        items = self._items.setdefault(class_id, set())
+        if entry[1] in items:
+            # the same image offered by overlapping shards
+            return
+        quota = self.class_quotas[class_id]
+        size = 1 if self.unit == IMAGES else entry[2]
+        if size > quota or entry[0] <= self._cutoffs.get(class_id, -math.inf):
+            return
+
+        reservoir = self.reservoirs.setdefault(class_id, [])
+        heapq.heappush(reservoir, entry)
+        items.add(entry[1])
+        total = self._sizes.get(class_id, 0) + size
+        while total > quota:
+            evicted = heapq.heappop(reservoir)
+            items.discard(evicted[1])
+            total -= 1 if self.unit == IMAGES else evicted[2]
+            self._cutoffs[class_id] = evicted[0]
+        self._sizes[class_id] = total
+
+    def _evict(self, class_id: int) -> None:
+        """Drop entries below a cutoff raised by merge"""
+
+        reservoir = self.reservoirs.get(class_id, [])
+        cutoff = self._cutoffs[class_id]
+        while reservoir and reservoir[0][0] <= cutoff:
+            evicted = heapq.heappop(reservoir)
+            self._items[class_id].discard(evicted[1])
+            self._sizes[class_id] -= 1 if self.unit == IMAGES else evicted[2]
+
+    def _random(self, item_id: str, class_id: int) -> float:
+        """Uniform in (0, 1), stable for (seed, item_id, class_id)"""
+
+        digest = hashlib.sha1(
+            f"{self.seed}|{item_id}|{class_id}".encode()
+        ).digest()
+        return (int.from_bytes(digest[:7], "big") + 1) / (2**56 + 1)
@@ -0,0 +1,3 @@
+from .base import StorageBackend
+from .local import LocalStorage
+from .s3 import S3Storage
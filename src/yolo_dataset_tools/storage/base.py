@@ -0,0 +1,145 @@
+"""StorageBackend"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import io
+from pathlib import PurePath
+from typing import Any, Callable, List, Sequence, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+# enough for PNG/GIF/BMP headers and JPEG SOF after a typical EXIF block
+HEADER_SIZE = 64 * 1024
+
+
+def image_size_from_header(data: bytes) -> Tuple[int, int] | None:
+    """:return: (width, height) or None if the header is incomplete"""
+
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        # only the header is parsed, pixels are not decoded
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return None
+
+
+class StorageBackend(ABC):
+    """
+    ### File operations of FileManager
+
+    Paths are resolved by FileManager with resolve(). Batch operations
+    are concurrent in a thread pool of max_workers by default, local
+    storage runs them sequentially.
+    """
+
+    is_local = False
+    max_workers = 16
+
+    @abstractmethod
+    def resolve(self, path: str | PurePath, base_dir: PurePath = None):
+        pass
+
+    @abstractmethod
+    def exists(self, path: PurePath) -> bool:
+        pass
+
+    @abstractmethod
+    def is_file(self, path: PurePath) -> bool:
+        pass
+
+    @abstractmethod
+    def is_dir(self, path: PurePath) -> bool:
+        pass
+
+    @abstractmethod
+    def make_dir(self, path: PurePath, exist_ok: bool = True) -> None:
+        pass
+
+    @abstractmethod
+    def list_dir(self, path: PurePath) -> List[str]:
+        """:return: names of files and subdirectories"""
+
+    @abstractmethod
+    def read_bytes(self, path: PurePath) -> bytes:
+        """:raise FileNotFoundError:"""
+
+    @abstractmethod
+    def read_range(self, path: PurePath, start: int, end: int) -> bytes:
+        """:return: bytes [start, end), less at the end of file"""
+
+    @abstractmethod
+    def write_bytes(self, path: PurePath, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def copy(self, src: PurePath, dst: PurePath) -> None:
+        """Copy file or directory"""
+
+    def move(self, src: PurePath, dst: PurePath) -> None:
+        self.copy(src, dst)
+        if self.is_dir(src):
+            self.remove_dir(src)
+        else:
+            self.remove_file(src)
+
+    @abstractmethod
+    def remove_file(self, path: PurePath) -> None:
+        pass
+
+    @abstractmethod
+    def remove_dir(self, path: PurePath) -> None:
+        pass
+
+    def read_many(
+        self,
+        paths: Sequence[PurePath],
+        max_workers: int = None,
+    ) -> List[bytes | None]:
+        """:return: file contents in paths order, None for missing files"""
+
+        def read(path: PurePath) -> bytes | None:
+            try:
+                return self.read_bytes(path)
+            except FileNotFoundError:
+                return None
+
+        return self.map(read, paths, max_workers)
+
+    def image_sizes(
+        self,
+        paths: Sequence[PurePath],
+        max_workers: int = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        Ranged reads of image headers, the whole file is read only if the
+        header does not fit HEADER_SIZE
+        :return: [(width, height), ...] in paths order
+        """
+
+        def image_size(path: PurePath) -> Tuple[int, int]:
+            size = image_size_from_header(
+                self.read_range(path, 0, HEADER_SIZE)
+            )
+            if size is None:
+                size = image_size_from_header(self.read_bytes(path))
+            if size is None:
+                raise ValueError(f"Image header not recognized: {path}")
+            return size
+
+        return self.map(image_size, paths, max_workers)
+
+    def map(
+        self,
+        func: Callable[[Any], T],
+        items: Sequence[Any],
+        max_workers: int = None,
+    ) -> List[T]:
+        """Run I/O bound func for every item in a thread pool"""
+
+        if len(items) < 2:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers or self.max_workers) as pool:
+            return list(pool.map(func, items))
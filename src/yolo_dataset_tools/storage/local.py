@@ -0,0 +1,80 @@
+"""LocalStorage"""
+
+import os
+from pathlib import Path
+import shutil
+from typing import Any, Callable, List, Sequence, Tuple
+
+from .base import StorageBackend, T
+
+
+class LocalStorage(StorageBackend):
+    """pathlib and shutil file operations"""
+
+    is_local = True
+
+    def resolve(self, path: str | Path, base_dir: Path = None) -> Path:
+        path = Path(path)
+        return (base_dir / path).resolve() if base_dir else path.resolve()
+
+    def exists(self, path: Path) -> bool:
+        return path.exists()
+
+    def is_file(self, path: Path) -> bool:
+        return path.is_file()
+
+    def is_dir(self, path: Path) -> bool:
+        return path.is_dir()
+
+    def make_dir(self, path: Path, exist_ok: bool = True) -> None:
+        path.mkdir(parents=True, exist_ok=exist_ok)
+
+    def list_dir(self, path: Path) -> List[str]:
+        return os.listdir(path)
+
+    def read_bytes(self, path: Path) -> bytes:
+        return path.read_bytes()
+
+    def read_range(self, path: Path, start: int, end: int) -> bytes:
+        with open(path, "rb") as fp:
+            fp.seek(start)
+            return fp.read(end - start)
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        path.write_bytes(data)
+
+    def copy(self, src: Path, dst: Path) -> None:
+        if src.is_file():
+            shutil.copy2(src, dst)
+        else:
+            shutil.copytree(src, dst)
+
+    def move(self, src: Path, dst: Path) -> None:
+        shutil.move(src, dst)
+
+    def remove_file(self, path: Path) -> None:
+        path.unlink()
+
+    def remove_dir(self, path: Path) -> None:
+        shutil.rmtree(path)
+
+    def map(
+        self,
+        func: Callable[[Any], T],
+        items: Sequence[Any],
+        max_workers: int = None,
+    ) -> List[T]:
+        return [func(item) for item in items]
+
+    def image_sizes(
+        self,
+        paths: Sequence[Path],
+        max_workers: int = None,
+    ) -> List[Tuple[int, int]]:
+        from PIL import Image
+
+        sizes = []
+        for path in paths:
+            with Image.open(path) as img:
+                sizes.append(img.size)
+        return sizes
@@ -0,0 +1,248 @@
+"""S3Storage"""
+
+from __future__ import annotations
+
+import posixpath
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+
+from .base import StorageBackend
+
+
+# boto3 is an optional dependency, imported when the client is created
+if TYPE_CHECKING:
+    from botocore.client import BaseClient
+
+
+class S3Storage(StorageBackend):
+    """
+    ### S3-compatible object storage
+
+    Paths are object keys relative to the bucket prefix, directories are
+    key prefixes ending with "/". One client with a connection pool of
+    max_pool_connections is shared by the worker threads of batch reads.
+    Copies are server-side, objects are not downloaded.
+
+    MinIO or a moto server: S3Storage("bucket", endpoint_url="http://...")
+    """
+
+    # delete_objects and list_objects_v2 limits
+    DELETE_BATCH = 1000
+    LIST_PAGE_SIZE = 1000
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str = None,
+        max_pool_connections: int = 32,
+        max_attempts: int = 5,
+        **client_kwargs: Any,
+    ) -> None:
+        """
+        :param bucket: bucket name
+        :param prefix: key prefix of all paths, e.g. "datasets"
+        :param endpoint_url: S3-compatible server, None - AWS
+        :param max_pool_connections: connection pool size, also the number
+        of threads of batch reads
+        :param max_attempts: retries of throttled and failed requests
+        :param client_kwargs: boto3.client arguments, e.g. region_name,
+        aws_access_key_id, aws_secret_access_key
+        """
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.endpoint_url = endpoint_url
+        self.max_workers = max_pool_connections
+        self.max_attempts = max_attempts
+        self.client_kwargs = client_kwargs
+        self._client = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # clients are not picklable, process pool workers create their own
+        state = self.__dict__.copy()
+        state["_client"] = None
+        return state
+
+    @property
+    def client(self) -> BaseClient:
+        if self._client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError as e:
+                raise ImportError(
+                    "S3Storage requires boto3: pip install boto3"
+                ) from e
+
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self.endpoint_url,
+                config=Config(
+                    max_pool_connections=self.max_workers,
+                    retries={
+                        "max_attempts": self.max_attempts,
+                        "mode": "adaptive",
+                    },
+                ),
+                **self.client_kwargs,
+            )
+        return self._client
+
+    def resolve(
+        self,
+        path: str | PurePosixPath,
+        base_dir: PurePosixPath = None,
+    ) -> PurePosixPath:
+        path = str(path)
+        if base_dir and not path.startswith("/"):
+            path = f"{base_dir}/{path}"
+        return PurePosixPath(posixpath.normpath(f"/{path}").lstrip("/"))
+
+    def exists(self, path: PurePosixPath) -> bool:
+        return self.is_file(path) or self.is_dir(path)
+
+    def is_file(self, path: PurePosixPath) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(path))
+        except ClientError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+        return True
+
+    def is_dir(self, path: PurePosixPath) -> bool:
+        response = self.client.list_objects_v2(
+            Bucket=self.bucket, Prefix=self._dir_key(path), MaxKeys=1
+        )
+        return response.get("KeyCount", 0) > 0
+
+    def make_dir(self, path: PurePosixPath, exist_ok: bool = True) -> None:
+        # directories exist while they have objects
+        if not exist_ok and self.is_dir(path):
+            raise FileExistsError(f"Directory {path} already exists")
+
+    def list_dir(self, path: PurePosixPath) -> List[str]:
+        """Paginated listing, up to LIST_PAGE_SIZE keys per request"""
+
+        dir_key = self._dir_key(path)
+        names = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=self.bucket,
+            Prefix=dir_key,
+            Delimiter="/",
+            PaginationConfig={"PageSize": self.LIST_PAGE_SIZE},
+        ):
+            for item in page.get("Contents", []):
+                # skip "directory" marker objects
+                if item["Key"] != dir_key:
+                    names.append(item["Key"][len(dir_key) :])
+            for item in page.get("CommonPrefixes", []):
+                names.append(item["Prefix"][len(dir_key) :].rstrip("/"))
+        return names
+
+    def read_bytes(self, path: PurePosixPath) -> bytes:
+        return self._get(path)
+
+    def read_range(self, path: PurePosixPath, start: int, end: int) -> bytes:
+        return self._get(path, Range=f"bytes={start}-{end - 1}")
+
+    def write_bytes(self, path: PurePosixPath, data: bytes) -> None:
+        self.client.put_object(
+            Bucket=self.bucket, Key=self._key(path), Body=data
+        )
+
+    def copy(self, src: PurePosixPath, dst: PurePosixPath) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self._copy_object(self._key(src), self._key(dst))
+        except ClientError as e:
+            if not self._is_not_found(e):
+                raise
+
+        # not an object, copy the directory
+        src_key, dst_key = self._dir_key(src), self._dir_key(dst)
+        keys = list(self._list_keys(src_key))
+        if not keys:
+            raise FileNotFoundError(f"{src} not found")
+        self.map(
+            lambda key: self._copy_object(key, dst_key + key[len(src_key) :]),
+            keys,
+        )
+
+    def remove_file(self, path: PurePosixPath) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(path))
+
+    def remove_dir(self, path: PurePosixPath) -> None:
+        keys = list(self._list_keys(self._dir_key(path)))
+        for start in range(0, len(keys), self.DELETE_BATCH):
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={
+                    "Objects": [
+                        {"Key": key}
+                        for key in keys[start : start + self.DELETE_BATCH]
+                    ],
+                    "Quiet": True,
+                },
+            )
+            # quiet mode reports failed deletes only
+            errors = response.get("Errors", [])
+            if errors:
+                raise RuntimeError(
+                    f"{len(errors)} objects of {path} not deleted, first: "
+                    f"{errors[0].get('Key')} ({errors[0].get('Code')})"
+                )
+
+    def _key(self, path: PurePosixPath) -> str:
+        key = str(path).strip("/")
+        if key == ".":
+            key = ""
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _dir_key(self, path: PurePosixPath) -> str:
+        key = self._key(path)
+        return f"{key}/" if key else ""
+
+    def _list_keys(self, dir_key: str) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=self.bucket,
+            Prefix=dir_key,
+            PaginationConfig={"PageSize": self.LIST_PAGE_SIZE},
+        ):
+            for item in page.get("Contents", []):
+                yield item["Key"]
+
+    def _get(self, path: PurePosixPath, **kwargs: Any) -> bytes:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self._key(path), **kwargs
+            )
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(f"{path} not found") from e
+            raise
+        with response["Body"] as body:
+            return body.read()
+
+    def _copy_object(self, src_key: str, dst_key: str) -> None:
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=dst_key,
+            CopySource={"Bucket": self.bucket, "Key": src_key},
+        )
+
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        return error.response.get("Error", {}).get("Code") in (
+            "404",
+            "NoSuchKey",
+            "NotFound",
+        )
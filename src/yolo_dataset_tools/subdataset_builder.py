@@ -1,15 +1,53 @@
 """DatasetSubsetBulder"""
 
-import os
+from __future__ import annotations
+
+from copy import deepcopy
+from dataclasses import dataclass
 from pathlib import Path
-from PIL import Image
-from tqdm import tqdm
-from typing import List, Union
-import yaml
+from typing import TYPE_CHECKING, Iterator, List, Sequence, Tuple, Union
 
 from .dataset_filters.base import BaseFilter
+from .filemanager import FileManager
 from .filemanager import filemanager as fm
+from .filter_cache import (
+    FilterCache,
+    chain_prefix_hashes,
+    dataset_hash,
+    fingerprint,
+)
 from .models.yolo import DatasetInfo, ImageInfo
+from .sampling import ClassBalancedSampler
+
+
+# heavy dependencies (PIL, yaml, tqdm, numpy) are imported on first use
+if TYPE_CHECKING:
+    from .transforms.base import BaseTransform, TransformOutput, TransformTask
+    from .transforms.tiling import Tile, TilesOutput, TilesTask, TileTransform
+
+
+# (image_filename, annotation_lines, output_images_path, output_labels_path)
+WriteJob = Tuple[str, List[str], Path, Path]
+
+
+@dataclass
+class SubsetChain:
+    name: str
+    path: Path
+    filters: List[BaseFilter]
+    info: DatasetInfo
+    # FilterCache keys of every chain prefix
+    prefix_hashes: List[str | None]
+    # optional class-balanced sampling of the filtered images
+    sampler: ClassBalancedSampler | None = None
+
+    @property
+    def images_path(self) -> Path:
+        return self.path / "images"
+
+    @property
+    def labels_path(self) -> Path:
+        return self.path / "labels"
 
 
 class SubDatasetBuilder:
@@ -24,132 +62,504 @@ class SubDatasetBuilder:
         └── classes.txt or data.yaml
     """
 
-    def __init__(self, dataset_path: str | Path, *args) -> None:
+    # images and labels read and written per batch
+    IO_BATCH = 256
+
+    def __init__(
+        self,
+        dataset_path: str | Path,
+        *args,
+        cache: FilterCache = None,
+        filemanager: FileManager = None,
+    ) -> None:
         """
         :param dataset_path: аболютный путь к директории, содержащей папки images и labels с изображениями и аннотациями соответственно, а также файл classes.txt или data.yaml
+        :param cache: optional filter results cache, reused across runs and subsets
+        :param filemanager: dataset and subsets storage, e.g.
+        FileManager(storage=S3Storage(...)), local files if not set
         """
 
-        self.dataset_path = fm.resolve_path(dataset_path)
+        self.fm = filemanager or fm
+        self.dataset_path = self.fm.resolve_path(dataset_path)
         self.images_path = self.dataset_path / "images"
         self.labels_path = self.dataset_path / "labels"
         self.dataset_info = self._load_dataset_info()
-        self.subset_info = self.dataset_info
+        self.subset_info = deepcopy(self.dataset_info)
         self.filters: List[BaseFilter] = []
+        self.subsets: List[SubsetChain] = []
+        self.cache = cache
 
     def add_filter(self, filter: BaseFilter):
         filter.set_rules(self.subset_info)
         self.subset_info = filter.transform_dataset_info(self.subset_info)
         self.filters.append(filter)
 
-    def build_subset(self, subset_path: Union[str, Path]):
+    def add_subset(
+        self,
+        name: str,
+        subset_path: Union[str, Path],
+        filters: List[BaseFilter],
+        sampler: ClassBalancedSampler = None,
+    ):
+        """
+        Named filter chain for build_subsets
+        :param subset_path: subset path. Warning: subset directory will be cleaned!
+        :param filters: filter instances of this chain, instances must not be
+        shared between chains. Empty if the subset is sampled, resized or
+        tiled only
+        :param sampler: optional class quotas applied after the filters
+        """
+
+        subset_path = self.fm.resolve_path(subset_path)
+        for chain in self.subsets:
+            if chain.name == name or chain.path == subset_path:
+                raise ValueError(f"Subset '{name}' ({subset_path}) exists")
+
+        subset_info = deepcopy(self.dataset_info)
+        for filter in filters:
+            filter.set_rules(subset_info)
+            subset_info = filter.transform_dataset_info(subset_info)
+        if sampler:
+            sampler.set_rules(subset_info)
+        self.subsets.append(
+            SubsetChain(
+                name=name,
+                path=subset_path,
+                filters=list(filters),
+                info=subset_info,
+                prefix_hashes=self._get_prefix_hashes(filters),
+                sampler=sampler,
+            )
+        )
+
+    def build_subset(
+        self,
+        subset_path: Union[str, Path],
+        transform: BaseTransform = None,
+        tiling: TileTransform = None,
+        max_workers: int = None,
+        sampler: ClassBalancedSampler = None,
+    ):
         """
         Dataset subset build running
         :param subset_path: subset path. Warning: subset directory will be cleaned!
+        :param transform: optional images and labels transform (e.g. ResizeTransform),
+        images are copied as is if not set
+        :param tiling: optional images tiling, filters are applied to every tile
+        :param max_workers: transform or tiling process pool size
+        :param sampler: optional class quotas applied after the filters
         """
 
-        if not self.filters:
-            raise RuntimeError("Filters list is empty")
+        if sampler:
+            sampler.set_rules(self.subset_info)
+        self._build(
+            [
+                SubsetChain(
+                    name=Path(subset_path).name,
+                    path=self.fm.resolve_path(subset_path),
+                    filters=self.filters,
+                    info=self.subset_info,
+                    prefix_hashes=self._get_prefix_hashes(self.filters),
+                    sampler=sampler,
+                )
+            ],
+            transform=transform,
+            tiling=tiling,
+            max_workers=max_workers,
+        )
 
-        subset_path = fm.resolve_path(subset_path)
-        subset_images_path = subset_path / "images"
-        subset_labels_path = subset_path / "labels"
-        for dir in (subset_path, subset_images_path, subset_labels_path):
-            fm.remove_dir(dir)
-            fm.create_dir(dir)
+    def build_subsets(
+        self,
+        transform: BaseTransform = None,
+        tiling: TileTransform = None,
+        max_workers: int = None,
+    ):
+        """
+        Build all subsets added by add_subset in one pass over the dataset:
+        every image header and label file is read once, all filter chains
+        are evaluated on the shared data
+        :param transform: see build_subset
+        :param tiling: see build_subset
+        :param max_workers: see build_subset
+        """
+
+        if not self.subsets:
+            raise RuntimeError("Subsets list is empty")
+        self._build(
+            self.subsets,
+            transform=transform,
+            tiling=tiling,
+            max_workers=max_workers,
+        )
+
+    def _build(
+        self,
+        chains: List[SubsetChain],
+        transform: BaseTransform = None,
+        tiling: TileTransform = None,
+        max_workers: int = None,
+    ):
+        if transform and tiling:
+            raise ValueError("Transform and tiling can not be used together")
+        if tiling and any(chain.sampler for chain in chains):
+            raise ValueError("Sampling can not be used with tiling")
+        if (transform or tiling) and not self.fm.is_local:
+            raise ValueError("Transform and tiling require local storage")
+        for chain in chains:
+            # a plain copy of the dataset is not a subset
+            if not (chain.filters or chain.sampler or transform or tiling):
+                raise RuntimeError(
+                    f"Subset {chain.name}: filters list is empty, neither "
+                    "sampler nor transform or tiling is set"
+                )
 
-        count = 0
-        for image_filename in tqdm(
-            os.listdir(self.images_path), desc="Processed", leave=True
+        from tqdm import tqdm
+
+        for chain in chains:
+            # only the subset directory is removed, not its parents
+            self.fm.remove_dir(chain.path)
+            for dir in (chain.path, chain.images_path, chain.labels_path):
+                self.fm.create_dir(dir)
+
+        counts = {chain.name: 0 for chain in chains}
+        transform_tasks: List[TransformTask] = []
+        tiles_tasks: List[TilesTask] = []
+        write_jobs: List[WriteJob] = []
+        image_filenames = sorted(self.fm.list_dir(self.images_path))
+        for image_filename, image, annotations in tqdm(
+            self._read_dataset(image_filenames),
+            total=len(image_filenames),
+            desc="Processed",
+            leave=True,
         ):
-            with Image.open(self.images_path / image_filename) as img:
-                image = ImageInfo(width=img.size[0], height=img.size[1])
+            image_path = self.images_path / image_filename
+            if tiling:
+                tiles = tiling.split_annotations(annotations, image)
+                tiles_outputs: List[TilesOutput] = []
+                for chain in chains:
+                    chain_tiles = self._apply_filters_to_tiles(chain, tiles)
+                    if chain_tiles:
+                        counts[chain.name] += len(chain_tiles)
+                        tiles_outputs.append(
+                            (
+                                chain_tiles,
+                                chain.images_path,
+                                chain.labels_path,
+                            )
+                        )
+                if tiles_outputs:
+                    tiles_tasks.append((image_path, tiles_outputs))
+                continue
+
+            outputs: List[TransformOutput] = []
+            for chain in chains:
+                chain_annotations = self._apply_filters(
+                    chain, annotations, image
+                )
+                if not chain_annotations:
+                    continue
+                if chain.sampler:
+                    # written after the pass if kept by the sampler
+                    chain.sampler.offer(
+                        image_filename,
+                        chain_annotations,
+                        payload=(image, chain_annotations),
+                    )
+                    continue
+                counts[chain.name] += 1
+                outputs.append(
+                    (
+                        chain_annotations,
+                        chain.images_path,
+                        chain.labels_path,
+                    )
+                )
+            self._write_outputs(
+                image_filename,
+                image,
+                outputs,
+                transform_tasks if transform else None,
+                write_jobs,
+            )
+            if len(write_jobs) >= self.IO_BATCH:
+                self._write_images(write_jobs)
+
+        for chain in chains:
+            if not chain.sampler:
+                continue
+            for image_filename, (image, chain_annotations) in tqdm(
+                chain.sampler.selected(), desc=f"Sampled {chain.name}"
+            ):
+                counts[chain.name] += 1
+                self._write_outputs(
+                    image_filename,
+                    image,
+                    [
+                        (
+                            chain_annotations,
+                            chain.images_path,
+                            chain.labels_path,
+                        )
+                    ],
+                    transform_tasks if transform else None,
+                    write_jobs,
+                )
+                if len(write_jobs) >= self.IO_BATCH:
+                    self._write_images(write_jobs)
+
+        self._write_images(write_jobs)
+        if transform:
+            transform.apply_many(transform_tasks, max_workers)
+        if tiling:
+            tiling.write_many(tiles_tasks, max_workers)
+        if self.cache:
+            self.cache.flush()
+            print(
+                f"Filter cache: {self.cache.hits} hits, "
+                f"{self.cache.misses} misses"
+            )
+        for chain in chains:
+            print(f"{counts[chain.name]} files added to subset {chain.name}")
+            self._transform_dataset_info(chain.info)
+            self._dump_dataset_metadata(chain.path, chain.info)
+
+    def _write_outputs(
+        self,
+        image_filename: str,
+        image: ImageInfo,
+        outputs: List[TransformOutput],
+        transform_tasks: List[TransformTask] | None,
+        write_jobs: List[WriteJob],
+    ) -> None:
+        """Add copy jobs, or transform task if tasks are set"""
+
+        if not outputs:
+            return
+        if transform_tasks is not None:
+            transform_tasks.append(
+                (self.images_path / image_filename, image, outputs)
+            )
+            return
+        for output in outputs:
+            write_jobs.append((image_filename, *output))
+
+    def _write_images(self, write_jobs: List[WriteJob]) -> None:
+        """Copy images and dump labels, concurrently for remote storages"""
 
-            label_filename = Path(image_filename).stem + ".txt"
+        def write(job: WriteJob) -> None:
+            image_filename, annotations, images_path, labels_path = job
+            self._dump_image_annotations(
+                annotations_path=labels_path
+                / (Path(image_filename).stem + ".txt"),
+                annotations=annotations,
+            )
+            # subset directories are new, nothing to rename
+            self.fm.copy_file(
+                src=self.images_path / image_filename,
+                dst=images_path / image_filename,
+                auto_rename=False,
+                overwrite=True,
+            )
+
+        self.fm.storage.map(write, write_jobs)
+        write_jobs.clear()
+
+    def _read_dataset(
+        self,
+        image_filenames: List[str],
+    ) -> Iterator[Tuple[str, ImageInfo, List[str] | None]]:
+        """
+        Image sizes and labels are read per IO_BATCH images, concurrently
+        for remote storages
+        :return: (image_filename, image_info, annotation_lines) iterator
+        """
+
+        for start in range(0, len(image_filenames), self.IO_BATCH):
+            batch = image_filenames[start : start + self.IO_BATCH]
+            sizes = self.fm.image_sizes(
+                [self.images_path / image_filename for image_filename in batch]
+            )
             annotations = self._load_annotations(
-                self.labels_path / label_filename
+                [
+                    self.labels_path / (Path(image_filename).stem + ".txt")
+                    for image_filename in batch
+                ]
             )
-            for filter in self.filters:
-                if not annotations:
-                    break
-                annotations = filter.apply(annotations, image)
+            for image_filename, (width, height), image_annotations in zip(
+                batch, sizes, annotations
+            ):
+                yield (
+                    image_filename,
+                    ImageInfo(width=width, height=height),
+                    image_annotations,
+                )
 
-            if annotations:
-                count += 1
-                self._dump_image_annotations(
-                    annotations_path=subset_labels_path / label_filename,
-                    annotations=annotations,
+    def _get_prefix_hashes(
+        self,
+        filters: List[BaseFilter],
+    ) -> List[str | None]:
+        return chain_prefix_hashes(
+            dataset_hash(self.dataset_info.names),
+            [filter.config_hash() for filter in filters],
+        )
+
+    def _apply_filters(
+        self,
+        chain: SubsetChain,
+        annotations: List[str],
+        image: ImageInfo,
+    ) -> List[str]:
+        """
+        With cache: the longest cached chain prefix result is taken,
+        only the rest filters are applied and their results are cached
+        """
+
+        start = 0
+        use_cache = bool(self.cache and annotations)
+        if use_cache:
+            label_fingerprint = fingerprint(annotations)
+            for step in range(len(chain.filters), 0, -1):
+                prefix_hash = chain.prefix_hashes[step - 1]
+                if prefix_hash is None:
+                    continue
+                hit, cached = self.cache.get(
+                    self.cache.make_key(prefix_hash, label_fingerprint, image)
                 )
-                fm.copy_file(
-                    src=self.images_path / image_filename,
-                    dst=subset_images_path / image_filename,
+                if hit:
+                    annotations, start = cached, step
+                    break
+
+        for step in range(start, len(chain.filters)):
+            if not annotations:
+                break
+            annotations = chain.filters[step].apply(annotations, image)
+            if use_cache and chain.prefix_hashes[step] is not None:
+                self.cache.put(
+                    self.cache.make_key(
+                        chain.prefix_hashes[step], label_fingerprint, image
+                    ),
+                    annotations,
                 )
+        return annotations
 
-        print(f"{count} files added to subset")
-        self._transform_dataset_info()
-        self._dump_dataset_metadata(subset_path)
+    def _apply_filters_to_tiles(
+        self,
+        chain: SubsetChain,
+        tiles: List[Tile],
+    ) -> List[Tile]:
+        """Tiles without annotations are kept only if they were empty before filtering"""
 
-    def _load_dataset_info(self) -> DatasetInfo:
-        data_yaml_path = self.dataset_path / "data.yaml"
-        classes_txt_path = self.dataset_path / "classes.txt"
-        if not fm.is_file(data_yaml_path) and not fm.is_file(classes_txt_path):
-            raise FileNotFoundError(f"Dataset metadata files not found")
-
-        if not fm.is_file(data_yaml_path):
-            return self.convert_classes_txt_to_data_yaml(
-                classes_txt_path, data_yaml_path, save=False
-            )
+        filtered_tiles: List[Tile] = []
+        for region, tile_annotations in tiles:
+            if tile_annotations:
+                tile_annotations = self._apply_filters(
+                    chain,
+                    tile_annotations,
+                    ImageInfo(
+                        width=region[2] - region[0],
+                        height=region[3] - region[1],
+                    ),
+                )
+                if not tile_annotations:
+                    continue
+            filtered_tiles.append((region, tile_annotations))
+        return filtered_tiles
 
-        with open(data_yaml_path, "r", encoding="utf-8") as fp:
-            content = yaml.safe_load(fp)
+    def _load_dataset_info(self) -> DatasetInfo:
+        return self.load_dataset_info(self.dataset_path, self.fm)
 
-        return DatasetInfo.from_dict(content)
+    def _load_annotations(
+        self,
+        annotations_paths: Sequence[Path],
+    ) -> List[List[str] | None]:
+        """:return: annotation lines per file, None for missing files"""
 
-    def _load_annotations(self, annotations_path: Path) -> List[str]:
-        if fm.is_file(annotations_path):
-            with open(annotations_path, "r") as fp:
-                return [line.strip() for line in fp.readlines()]
+        return [
+            (
+                [line.strip() for line in data.decode().splitlines()]
+                if data is not None
+                else None
+            )
+            for data in self.fm.read_many(annotations_paths)
+        ]
 
     def _dump_image_annotations(
         self,
         annotations_path: str | Path,
         annotations: List[str],
     ) -> None:
-        with open(annotations_path, "w") as fp:
-            fp.write("\n".join(annotations))
-
-    def _transform_dataset_info(self):
-        self.subset_info.train = "images"
-        self.subset_info.val = ""
-        self.subset_info.test = ""
-
-    def _dump_dataset_metadata(self, subset_path: Path) -> None:
-        with open(subset_path / "data.yaml", "w") as fp:
-            fp.write(str(self.subset_info))
-            print(f"data.yaml created: {subset_path / "data.yaml"}")
-        with open(subset_path / "classes.txt", "w") as fp:
-            fp.write("\n".join(self.subset_info.names))
-            print(f"classes.txt created: {subset_path / "classes.txt"}")
+        self.fm.write_text(annotations_path, "\n".join(annotations))
+
+    def _transform_dataset_info(self, subset_info: DatasetInfo):
+        subset_info.train = "images"
+        subset_info.val = ""
+        subset_info.test = ""
+
+    def _dump_dataset_metadata(
+        self,
+        subset_path: Path,
+        subset_info: DatasetInfo,
+    ) -> None:
+        self.fm.write_text(subset_path / "data.yaml", str(subset_info))
+        print(f"data.yaml created: {subset_path / "data.yaml"}")
+        self.fm.write_text(
+            subset_path / "classes.txt", "\n".join(subset_info.names)
+        )
+        print(f"classes.txt created: {subset_path / "classes.txt"}")
+
+    @staticmethod
+    def load_dataset_info(
+        dataset_path: str | Path,
+        filemanager: FileManager = None,
+    ) -> DatasetInfo:
+        """
+        :param dataset_path: directory with classes.txt or data.yaml
+        :param filemanager: dataset storage, local files if not set
+        """
+
+        filemanager = filemanager or fm
+        dataset_path = filemanager.resolve_path(dataset_path)
+        data_yaml_path = dataset_path / "data.yaml"
+        classes_txt_path = dataset_path / "classes.txt"
+        if not filemanager.is_file(data_yaml_path):
+            if not filemanager.is_file(classes_txt_path):
+                raise FileNotFoundError(f"Dataset metadata files not found")
+            return SubDatasetBuilder.convert_classes_txt_to_data_yaml(
+                classes_txt_path,
+                data_yaml_path,
+                save=False,
+                filemanager=filemanager,
+            )
+
+        import yaml
+
+        content = yaml.safe_load(filemanager.read_text(data_yaml_path))
+
+        return DatasetInfo.from_dict(content)
 
     @staticmethod
     def convert_classes_txt_to_data_yaml(
         classes_txt_path: str | Path,
         data_yaml_path: Union[str | Path] = None,
         save: bool = True,
+        filemanager: FileManager = None,
     ) -> DatasetInfo:
-        with open(classes_txt_path, "r", encoding="utf-8") as fp:
-            classes = [line.strip() for line in fp.readlines()]
-            dataset_info = DatasetInfo(
-                train="images",
-                val="",
-                test="",
-                nc=len(classes),
-                names=classes,
-            )
+        filemanager = filemanager or fm
+        classes = [
+            line.strip()
+            for line in filemanager.read_text(classes_txt_path).splitlines()
+        ]
+        dataset_info = DatasetInfo(
+            train="images",
+            val="",
+            test="",
+            nc=len(classes),
+            names=classes,
+        )
 
         if save:
             if not data_yaml_path:
                 data_yaml_path = "data.yaml"
-            with open(data_yaml_path, "w") as fp:
-                fp.write(str(dataset_info))
+            filemanager.write_text(data_yaml_path, str(dataset_info))
 
         return dataset_info
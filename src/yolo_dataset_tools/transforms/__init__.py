@@ -0,0 +1,3 @@
+from .base import BaseTransform
+from .resize import ResizeTransform
+from .tiling import TileTransform
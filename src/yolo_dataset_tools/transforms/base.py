@@ -0,0 +1,156 @@
+"""BaseTransform"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from pathlib import Path
+from tqdm import tqdm
+from typing import Any, Callable, List, Sequence, Tuple
+
+from ..models.yolo import ImageInfo
+
+
+# (annotation_lines, output_images_path, output_labels_path)
+TransformOutput = Tuple[List[str], Path, Path]
+# (image_path, image_info, outputs), one source image to several datasets
+TransformTask = Tuple[Path, ImageInfo, List[TransformOutput]]
+
+
+def parse_annotations(
+    annotation_lines: List[str],
+) -> Tuple[np.ndarray, np.ndarray, List[List[str]]]:
+    """
+    :param annotation_lines: [ "{cls} {xc or x1} {yc or y1} ...", ... ]
+    :return: class ids (N,), coords (N, 4) "xcn ycn wn hn" or (N, 8) OBB
+    corners "x1n y1n ... x4n y4n", extra columns of every line (e.g. "r")
+    """
+
+    split_lines = [line.split() for line in annotation_lines if line.strip()]
+    if not split_lines:
+        return np.empty(0, dtype=int), np.empty((0, 4)), []
+
+    is_obb = len(split_lines[0]) == 9
+    if any((len(values) == 9) != is_obb for values in split_lines):
+        raise ValueError("Mixed box and OBB annotations")
+    n_coords = 8 if is_obb else 4
+    if any(len(values) < n_coords + 1 for values in split_lines):
+        raise ValueError("Annotation line has too few values")
+
+    class_ids = np.array([int(values[0]) for values in split_lines])
+    coords = np.array(
+        [values[1 : n_coords + 1] for values in split_lines], dtype=float
+    )
+    extras = [values[n_coords + 1 :] for values in split_lines]
+    return class_ids, coords, extras
+
+
+def format_annotations(
+    class_ids: np.ndarray,
+    coords: np.ndarray,
+    extras: Sequence[List[str]],
+) -> List[str]:
+    return [
+        " ".join([str(class_id), *(f"{value:.6f}" for value in row), *extra])
+        for class_id, row, extra in zip(class_ids.tolist(), coords, extras)
+    ]
+
+
+def run_in_pool(
+    worker: Callable[[Any, Any], int],
+    transform: Any,
+    tasks: List[Any],
+    max_workers: int = None,
+    desc: str = "Transformed",
+) -> int:
+    """
+    Run worker(transform, task) for every task in a process pool
+    :return: sum of worker results
+    """
+
+    if not tasks:
+        return 0
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return sum(
+            tqdm(
+                pool.map(
+                    worker,
+                    repeat(transform),
+                    tasks,
+                    chunksize=max(1, min(64, len(tasks) // 256)),
+                ),
+                total=len(tasks),
+                desc=desc,
+                leave=True,
+            )
+        )
+
+
+def _apply_task(transform: "BaseTransform", task: TransformTask) -> int:
+    """Process pool worker"""
+
+    return transform.apply_outputs(*task)
+
+
+class BaseTransform(ABC):
+    """Image and labels transform, writes its results to the output dataset"""
+
+    @abstractmethod
+    def apply(
+        self,
+        image_path: Path,
+        annotation_lines: List[str],
+        image_info: ImageInfo,
+        images_path: Path,
+        labels_path: Path,
+    ) -> int:
+        """
+        :param images_path: output images directory
+        :param labels_path: output labels directory
+        :return: number of images written
+        """
+        pass
+
+    def apply_outputs(
+        self,
+        image_path: Path,
+        image_info: ImageInfo,
+        outputs: List[TransformOutput],
+    ) -> int:
+        """
+        One source image to several output datasets, override to decode
+        the image once
+        :return: number of images written
+        """
+
+        return sum(
+            self.apply(
+                image_path,
+                annotation_lines,
+                image_info,
+                images_path,
+                labels_path,
+            )
+            for annotation_lines, images_path, labels_path in outputs
+        )
+
+    def apply_many(
+        self,
+        tasks: List[TransformTask],
+        max_workers: int = None,
+    ) -> int:
+        """
+        Run transform for every task in a process pool
+        :return: number of images written
+        """
+
+        return run_in_pool(_apply_task, self, tasks, max_workers)
+
+    @staticmethod
+    def _dump_annotations(
+        annotations_path: Path,
+        annotation_lines: List[str],
+    ) -> None:
+        annotations_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(annotations_path, "w") as fp:
+            fp.write("\n".join(annotation_lines))
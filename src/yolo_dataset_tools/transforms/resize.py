@@ -0,0 +1,146 @@
+"""ResizeTransform"""
+
+import numpy as np
+from pathlib import Path
+from PIL import Image
+from typing import List, Tuple
+
+from .base import (
+    BaseTransform,
+    TransformOutput,
+    format_annotations,
+    parse_annotations,
+)
+from ..filemanager import filemanager as fm
+from ..models.yolo import ImageInfo
+
+
+class ResizeTransform(BaseTransform):
+    def __init__(
+        self,
+        size: int | Tuple[int, int],
+        letterbox: bool = False,
+        allow_upscale: bool = False,
+        pad_color: Tuple[int, int, int] = (114, 114, 114),
+        quality: int = 90,
+    ) -> None:
+        """
+        :param size: target size, int or (width, height)
+        :param letterbox: False - image is scaled to fit into size keeping
+        aspect ratio, True - additionally padded to exactly size
+        :param allow_upscale: scale images smaller than size up
+        :param pad_color: letterbox padding RGB color
+        :param quality: JPEG quality of output images
+        """
+
+        target = (size, size) if isinstance(size, int) else tuple(size)
+        if len(target) != 2 or min(target) <= 0:
+            raise ValueError(f"Incorrect target size {size}")
+        self.target_width, self.target_height = target
+        self.letterbox = letterbox
+        self.allow_upscale = allow_upscale
+        self.pad_color = tuple(pad_color)
+        self.quality = quality
+
+    def get_geometry(
+        self,
+        image_info: ImageInfo,
+    ) -> Tuple[int, int, int, int, ImageInfo]:
+        """:return: (resized width, resized height, pad x, pad y, output ImageInfo)"""
+
+        scale = min(
+            self.target_width / image_info.width,
+            self.target_height / image_info.height,
+        )
+        if not self.allow_upscale:
+            scale = min(scale, 1.0)
+        width = max(1, round(image_info.width * scale))
+        height = max(1, round(image_info.height * scale))
+        if not self.letterbox:
+            return width, height, 0, 0, ImageInfo(width=width, height=height)
+        return (
+            width,
+            height,
+            (self.target_width - width) // 2,
+            (self.target_height - height) // 2,
+            ImageInfo(width=self.target_width, height=self.target_height),
+        )
+
+    def transform_annotations(
+        self,
+        annotation_lines: List[str],
+        image_info: ImageInfo,
+    ) -> List[str]:
+        """
+        :param annotation_lines: [ "{cls} {xc or x1} {yc or y1} ...", ... ]
+        """
+
+        if not self.letterbox:
+            # normalized coordinates do not depend on the image scale
+            return annotation_lines
+
+        class_ids, coords, extras = parse_annotations(annotation_lines)
+        width, height, pad_x, pad_y, out_info = self.get_geometry(image_info)
+        scale_x = width / out_info.width
+        scale_y = height / out_info.height
+        shift_x = pad_x / out_info.width
+        shift_y = pad_y / out_info.height
+        if coords.shape[1] == 8:
+            # x1n y1n ... x4n y4n
+            scale = np.tile([scale_x, scale_y], 4)
+            shift = np.tile([shift_x, shift_y], 4)
+        else:
+            # xcn ycn wn hn
+            scale = np.array([scale_x, scale_y, scale_x, scale_y])
+            shift = np.array([shift_x, shift_y, 0.0, 0.0])
+        return format_annotations(class_ids, coords * scale + shift, extras)
+
+    def apply(
+        self,
+        image_path: Path,
+        annotation_lines: List[str],
+        image_info: ImageInfo,
+        images_path: Path,
+        labels_path: Path,
+    ) -> int:
+        return self.apply_outputs(
+            image_path,
+            image_info,
+            [(annotation_lines, images_path, labels_path)],
+        )
+
+    def apply_outputs(
+        self,
+        image_path: Path,
+        image_info: ImageInfo,
+        outputs: List[TransformOutput],
+    ) -> int:
+        """Image is resized and saved once, other outputs are hardlinks"""
+
+        width, height, pad_x, pad_y, out_info = self.get_geometry(image_info)
+        with Image.open(image_path) as img:
+            # JPEG: DCT scaling, decodes at 1/2, 1/4 or 1/8 of full resolution
+            img.draft("RGB", (width, height))
+            img = img.convert("RGB")
+            if img.size != (width, height):
+                img = img.resize((width, height), Image.Resampling.LANCZOS)
+        if self.letterbox:
+            canvas = Image.new(
+                "RGB", (out_info.width, out_info.height), self.pad_color
+            )
+            canvas.paste(img, (pad_x, pad_y))
+            img = canvas
+
+        saved_path = None
+        for annotation_lines, images_path, labels_path in outputs:
+            images_path.mkdir(parents=True, exist_ok=True)
+            if saved_path is None:
+                saved_path = images_path / image_path.name
+                img.save(saved_path, quality=self.quality)
+            else:
+                fm.link_file(saved_path, images_path / image_path.name)
+            self._dump_annotations(
+                labels_path / f"{image_path.stem}.txt",
+                self.transform_annotations(annotation_lines, image_info),
+            )
+        return len(outputs)
@@ -0,0 +1,474 @@
+"""TileTransform"""
+
+import numpy as np
+from pathlib import Path
+from PIL import Image
+from typing import Dict, List, Tuple
+
+from .base import (
+    BaseTransform,
+    format_annotations,
+    parse_annotations,
+    run_in_pool,
+)
+from ..filemanager import filemanager as fm
+from ..models.yolo import ImageInfo
+
+
+# (x1, y1, x2, y2) in pixels
+Region = Tuple[int, int, int, int]
+# (region, annotation_lines)
+Tile = Tuple[Region, List[str]]
+# (tiles, output_images_path, output_labels_path)
+TilesOutput = Tuple[List[Tile], Path, Path]
+# (image_path, outputs), one source image to several datasets
+TilesTask = Tuple[Path, List[TilesOutput]]
+
+
+def _next_vertices(
+    polygons: np.ndarray,
+    counts: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """:return: (M, V) valid vertices mask, (M, V, 2) next vertices"""
+
+    index = np.arange(polygons.shape[1])[None, :]
+    valid = index < counts[:, None]
+    next_index = np.where(index + 1 < counts[:, None], index + 1, 0)
+    return valid, np.take_along_axis(polygons, next_index[..., None], axis=1)
+
+
+def clip_polygons(
+    polygons: np.ndarray,
+    counts: np.ndarray,
+    rects: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sutherland-Hodgman clipping of every convex polygon by its rectangle,
+    vectorized over polygons
+    :param polygons: (M, V, 2) vertices, the first counts[m] are valid
+    :param counts: (M,) number of vertices
+    :param rects: (M, 4) "x1 y1 x2 y2"
+    :return: clipped polygons (M, V', 2) and counts (M,)
+    """
+
+    for axis, bound, sign in (
+        (0, rects[:, 0], 1.0),
+        (0, rects[:, 2], -1.0),
+        (1, rects[:, 1], 1.0),
+        (1, rects[:, 3], -1.0),
+    ):
+        valid, next_vertices = _next_vertices(polygons, counts)
+        # distances to the edge line, non-negative inside
+        dist = sign * (polygons[..., axis] - bound[:, None])
+        next_dist = sign * (next_vertices[..., axis] - bound[:, None])
+        inside, next_inside = dist >= 0, next_dist >= 0
+        denominator = dist - next_dist
+        t = dist / np.where(denominator == 0, 1.0, denominator)
+        crossings = polygons + t[..., None] * (next_vertices - polygons)
+
+        # every vertex gives itself if inside and the crossing of its edge
+        m, v = counts.shape[0], polygons.shape[1]
+        candidates = np.stack([polygons, crossings], axis=2).reshape(
+            m, 2 * v, 2
+        )
+        keep = np.stack(
+            [valid & inside, valid & (inside != next_inside)], axis=2
+        ).reshape(m, 2 * v)
+        order = np.argsort(~keep, axis=1, kind="stable")
+        counts = keep.sum(axis=1)
+        polygons = np.take_along_axis(candidates, order[..., None], axis=1)[
+            :, : max(counts.max(initial=0), 1)
+        ]
+    return polygons, counts
+
+
+def polygon_areas(polygons: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Shoelace formula, see clip_polygons for arguments"""
+
+    valid, next_vertices = _next_vertices(polygons, counts)
+    cross = (
+        polygons[..., 0] * next_vertices[..., 1]
+        - next_vertices[..., 0] * polygons[..., 1]
+    )
+    return np.abs(np.where(valid, cross, 0.0).sum(axis=1)) / 2
+
+
+def min_area_rects(
+    polygons: np.ndarray,
+    counts: np.ndarray,
+    rects: np.ndarray,
+) -> np.ndarray:
+    """
+    Minimum area rotated rectangle of every convex polygon among the ones
+    lying inside its rect: one of the rectangle sides is collinear with a
+    polygon edge (rotating calipers), the axis-aligned bounding box is
+    the fallback candidate
+    :return: (M, 4, 2) rectangle corners
+    """
+
+    valid, next_vertices = _next_vertices(polygons, counts)
+    edges = next_vertices - polygons
+    lengths = np.linalg.norm(edges, axis=2)
+    usable = valid & (lengths > 1e-9)
+    u = edges / np.maximum(lengths, 1e-9)[..., None]
+    # axis-aligned candidate
+    m = counts.shape[0]
+    u = np.concatenate([u, np.tile([[[1.0, 0.0]]], (m, 1, 1))], axis=1)
+    usable = np.concatenate([usable, np.ones((m, 1), dtype=bool)], axis=1)
+    w = np.stack([-u[..., 1], u[..., 0]], axis=2)
+
+    # (M, edges, vertices) projections
+    pu = np.einsum("mec,mvc->mev", u, polygons)
+    pw = np.einsum("mec,mvc->mev", w, polygons)
+    # polygons without vertices get zero extents
+    vertices_mask = valid[:, None, :] | (counts == 0)[:, None, None]
+    u_min = np.where(vertices_mask, pu, np.inf).min(axis=2)
+    u_max = np.where(vertices_mask, pu, -np.inf).max(axis=2)
+    w_min = np.where(vertices_mask, pw, np.inf).min(axis=2)
+    w_max = np.where(vertices_mask, pw, -np.inf).max(axis=2)
+    u_coefs = np.stack([u_min, u_max, u_max, u_min], axis=2)
+    w_coefs = np.stack([w_min, w_min, w_max, w_max], axis=2)
+    # (M, edges, 4, 2)
+    corners = (
+        u_coefs[..., None] * u[:, :, None, :]
+        + w_coefs[..., None] * w[:, :, None, :]
+    )
+
+    eps = 1e-6
+    inside = (
+        (corners[..., 0] >= rects[:, None, None, 0] - eps)
+        & (corners[..., 0] <= rects[:, None, None, 2] + eps)
+        & (corners[..., 1] >= rects[:, None, None, 1] - eps)
+        & (corners[..., 1] <= rects[:, None, None, 3] + eps)
+    ).all(axis=2)
+    areas = np.where(
+        usable & inside, (u_max - u_min) * (w_max - w_min), np.inf
+    )
+    best = areas.argmin(axis=1)
+    return np.clip(
+        corners[np.arange(m), best],
+        rects[:, None, :2],
+        rects[:, None, 2:],
+    )
+
+
+def rotated_box_corners(
+    coords: np.ndarray,
+    angles: np.ndarray,
+    size: np.ndarray,
+) -> np.ndarray:
+    """
+    :param coords: (N, 4) "xcn ycn wn hn"
+    :param angles: (N,) rotation in radians, applied in pixels
+    :param size: (width, height) of the image
+    :return: (N, 4, 2) corners in pixels
+    """
+
+    centers = coords[:, :2] * size
+    half = coords[:, 2:4] * size / 2
+    offsets = (
+        np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])[None] * half[:, None, :]
+    )
+    cos_a, sin_a = np.cos(angles)[:, None], np.sin(angles)[:, None]
+    return np.stack(
+        [
+            centers[:, None, 0]
+            + cos_a * offsets[..., 0]
+            - sin_a * offsets[..., 1],
+            centers[:, None, 1]
+            + sin_a * offsets[..., 0]
+            + cos_a * offsets[..., 1],
+        ],
+        axis=2,
+    )
+
+
+def _write_tiles_task(tiler: "TileTransform", task: TilesTask) -> int:
+    """Process pool worker"""
+
+    return tiler.write_tiles(*task)
+
+
+class TileTransform(BaseTransform):
+    def __init__(
+        self,
+        tile_size: int | Tuple[int, int],
+        stride: int | Tuple[int, int] = None,
+        min_visibility: float = 0.5,
+        keep_empty: bool = False,
+        quality: int = 90,
+    ) -> None:
+        """
+        :param tile_size: tile size, int or (width, height)
+        :param stride: tiles step, int or (x, y), default tile_size (no overlap)
+        :param min_visibility: min part of the box area inside a tile to keep the box
+        :param keep_empty: save tiles without annotations
+        :param quality: JPEG quality of output tiles
+        """
+
+        self.tile_width, self.tile_height = (
+            (tile_size, tile_size)
+            if isinstance(tile_size, int)
+            else tuple(tile_size)
+        )
+        if stride is None:
+            stride = (self.tile_width, self.tile_height)
+        self.stride_x, self.stride_y = (
+            (stride, stride) if isinstance(stride, int) else tuple(stride)
+        )
+        if min(self.tile_width, self.tile_height) <= 0:
+            raise ValueError(f"Incorrect tile size {tile_size}")
+        if not (
+            0 < self.stride_x <= self.tile_width
+            and 0 < self.stride_y <= self.tile_height
+        ):
+            raise ValueError(
+                "Stride must be positive and not exceed tile size"
+            )
+        if not 0.0 < min_visibility <= 1.0:
+            raise ValueError("Min visibility must be in (0, 1]")
+        self.min_visibility = min_visibility
+        self.keep_empty = keep_empty
+        self.quality = quality
+
+    def get_regions(self, image_info: ImageInfo) -> np.ndarray:
+        """
+        Tiles cover the whole image, the last tile of a row or column is
+        shifted back to the image border instead of being cut
+        :return: (K, 4) array of "x1 y1 x2 y2" in pixels
+        """
+
+        xs = self._get_starts(image_info.width, self.tile_width, self.stride_x)
+        ys = self._get_starts(
+            image_info.height, self.tile_height, self.stride_y
+        )
+        x1, y1 = np.meshgrid(xs, ys)
+        x1, y1 = x1.ravel(), y1.ravel()
+        return np.stack(
+            [
+                x1,
+                y1,
+                np.minimum(x1 + self.tile_width, image_info.width),
+                np.minimum(y1 + self.tile_height, image_info.height),
+            ],
+            axis=1,
+        )
+
+    def split_annotations(
+        self,
+        annotation_lines: List[str],
+        image_info: ImageInfo,
+    ) -> List[Tile]:
+        """
+        Clip annotations to every tile. A box is kept in a tile if at least
+        min_visibility of its area is inside the tile. OBB polygons are
+        clipped by the tile, visibility is the clipped polygon area ratio,
+        a partially visible OBB is replaced by the minimum area rotated
+        rectangle of its visible part. Rotated boxes "xcn ycn wn hn r"
+        (r in radians) are converted to OBB corners, their tiles have
+        OBB lines.
+
+        :param annotation_lines: [ "{cls} {xc or x1} {yc or y1} ...", ... ]
+        :return: [(region, tile annotation lines), ...], empty tiles are
+        dropped unless keep_empty
+        """
+
+        regions = self.get_regions(image_info)
+        class_ids, coords, extras = parse_annotations(annotation_lines or [])
+        if not len(class_ids):
+            return (
+                [(tuple(region.tolist()), []) for region in regions]
+                if self.keep_empty
+                else []
+            )
+
+        is_obb = coords.shape[1] == 8
+        size = np.array([image_info.width, image_info.height], dtype=float)
+        if is_obb:
+            # (N, 4, 2) corners in pixels
+            corners = coords.reshape(-1, 4, 2) * size
+        elif any(extras):
+            # xywhr, boxes without r are not rotated
+            angles = np.array([float(e[0]) if e else 0.0 for e in extras])
+            corners = rotated_box_corners(coords, angles, size)
+            extras = [e[1:] for e in extras]
+            is_obb = True
+        if is_obb:
+            boxes = np.concatenate(
+                [corners.min(axis=1), corners.max(axis=1)], axis=1
+            )
+        else:
+            centers = coords[:, :2] * size
+            half = coords[:, 2:4] * size / 2
+            boxes = np.concatenate([centers - half, centers + half], axis=1)
+
+        # (K, N) intersections of every tile with every box
+        tiles = regions[:, None, :].astype(float)
+        ix1 = np.maximum(tiles[..., 0], boxes[None, :, 0])
+        iy1 = np.maximum(tiles[..., 1], boxes[None, :, 1])
+        ix2 = np.minimum(tiles[..., 2], boxes[None, :, 2])
+        iy2 = np.minimum(tiles[..., 3], boxes[None, :, 3])
+        inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+        if is_obb:
+            keep, tiles_corners = self._clip_obb(regions, corners, inter > 0)
+        else:
+            area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            visibility = inter / np.maximum(area, 1e-12)[None, :]
+            keep = (inter > 0) & (visibility >= self.min_visibility)
+
+        result: List[Tile] = []
+        for k, region in enumerate(regions):
+            idx = np.flatnonzero(keep[k])
+            if not len(idx) and not self.keep_empty:
+                continue
+            x1, y1, x2, y2 = region.tolist()
+            tile_size = np.array([x2 - x1, y2 - y1], dtype=float)
+            if is_obb:
+                tile_coords = (
+                    (tiles_corners[k, idx] - [x1, y1]) / tile_size
+                ).reshape(-1, 8)
+            else:
+                clipped = np.stack(
+                    [ix1[k, idx], iy1[k, idx], ix2[k, idx], iy2[k, idx]],
+                    axis=1,
+                ) - np.array([x1, y1, x1, y1])
+                tile_coords = np.concatenate(
+                    [
+                        (clipped[:, :2] + clipped[:, 2:]) / 2 / tile_size,
+                        (clipped[:, 2:] - clipped[:, :2]) / tile_size,
+                    ],
+                    axis=1,
+                )
+            result.append(
+                (
+                    (x1, y1, x2, y2),
+                    format_annotations(
+                        class_ids[idx],
+                        tile_coords,
+                        [extras[i] for i in idx],
+                    ),
+                )
+            )
+        return result
+
+    def _clip_obb(
+        self,
+        regions: np.ndarray,
+        corners: np.ndarray,
+        candidates: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param regions: (K, 4) tiles
+        :param corners: (N, 4, 2) OBB corners in pixels
+        :param candidates: (K, N) tiles and boxes with intersecting
+        bounding boxes
+        :return: (K, N) keep mask, (K, N, 4, 2) corners of kept boxes in tiles
+        """
+
+        k, n = np.nonzero(candidates)
+        rects = regions[k].astype(float)
+        clipped, counts = clip_polygons(corners[n], np.full(len(n), 4), rects)
+        areas = polygon_areas(corners, np.full(len(corners), 4))
+        visibility = polygon_areas(clipped, counts) / np.maximum(
+            areas[n], 1e-12
+        )
+        selected = (visibility > 0) & (visibility >= self.min_visibility)
+        k, n = k[selected], n[selected]
+        clipped, counts, rects = (
+            clipped[selected],
+            counts[selected],
+            rects[selected],
+        )
+
+        keep = np.zeros(candidates.shape, dtype=bool)
+        keep[k, n] = True
+        tiles_corners = np.zeros(candidates.shape + (4, 2))
+        if not len(k):
+            return keep, tiles_corners
+        # fully visible boxes keep their corners as is
+        eps = 1e-6
+        inside = (
+            (corners[n] >= rects[:, None, :2] - eps)
+            & (corners[n] <= rects[:, None, 2:] + eps)
+        ).all(axis=(1, 2))
+        tiles_corners[k, n] = np.where(
+            inside[:, None, None],
+            corners[n],
+            min_area_rects(clipped, counts, rects),
+        )
+        return keep, tiles_corners
+
+    def write_tiles(
+        self,
+        image_path: Path,
+        outputs: List[TilesOutput],
+    ) -> int:
+        """
+        Image is decoded once, all its tiles are cut from the decoded image.
+        A tile needed by several outputs is saved once, others are hardlinks
+        :return: number of tiles written
+        """
+
+        if not any(tiles for tiles, _, _ in outputs):
+            return 0
+        count = 0
+        saved: Dict[Region, Path] = {}
+        with Image.open(image_path) as img:
+            img.load()
+            for tiles, images_path, labels_path in outputs:
+                images_path.mkdir(parents=True, exist_ok=True)
+                for region, annotation_lines in tiles:
+                    tile_stem = f"{image_path.stem}_{region[0]}_{region[1]}"
+                    tile_path = images_path / f"{tile_stem}{image_path.suffix}"
+                    if region in saved:
+                        fm.link_file(saved[region], tile_path)
+                    else:
+                        img.crop(region).save(tile_path, quality=self.quality)
+                        saved[region] = tile_path
+                    self._dump_annotations(
+                        labels_path / f"{tile_stem}.txt", annotation_lines
+                    )
+                    count += 1
+        return count
+
+    def write_many(
+        self,
+        tasks: List[TilesTask],
+        max_workers: int = None,
+    ) -> int:
+        """
+        Run write_tiles for every task in a process pool
+        :return: number of tiles written
+        """
+
+        return run_in_pool(
+            _write_tiles_task, self, tasks, max_workers, desc="Tiled"
+        )
+
+    def apply(
+        self,
+        image_path: Path,
+        annotation_lines: List[str],
+        image_info: ImageInfo,
+        images_path: Path,
+        labels_path: Path,
+    ) -> int:
+        return self.write_tiles(
+            image_path,
+            [
+                (
+                    self.split_annotations(annotation_lines, image_info),
+                    images_path,
+                    labels_path,
+                )
+            ],
+        )
+
+    @staticmethod
+    def _get_starts(length: int, tile: int, stride: int) -> np.ndarray:
+        if length <= tile:
+            return np.array([0])
+        starts = np.arange(0, length - tile + 1, stride)
+        if starts[-1] != length - tile:
+            starts = np.append(starts, length - tile)
+        return starts
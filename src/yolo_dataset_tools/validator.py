@@ -0,0 +1,150 @@
+"""DatasetValidator"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from .filemanager import filemanager as fm
+from .subdataset_builder import SubDatasetBuilder
+
+
+IMAGE_SUFFIXES = (
+    ".bmp",
+    ".jpeg",
+    ".jpg",
+    ".png",
+    ".tif",
+    ".tiff",
+    ".webp",
+)
+
+
+@dataclass
+class ValidationReport:
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.errors
+
+    def __repr__(self):
+        lines = [f"ERROR: {error}" for error in self.errors]
+        lines += [f"WARNING: {warning}" for warning in self.warnings]
+        lines.append(
+            f"{len(self.errors)} errors, {len(self.warnings)} warnings"
+        )
+        return "\n".join(lines)
+
+
+class DatasetValidator:
+    """
+    ### Dataset integrity validation
+
+    Checks image-label matching, duplicate image names and label lines
+    format. Images are not opened.
+
+    Dataset schema:
+
+    dataset/
+        ├── images/
+        ├── labels/
+        └── classes.txt or data.yaml
+    """
+
+    def __init__(self, dataset_path: str | Path, eps: float = 1e-6) -> None:
+        """
+        :param eps: allowed normalized coordinates overflow of [0, 1]
+        """
+
+        self.dataset_path = fm.resolve_path(dataset_path)
+        self.images_path = self.dataset_path / "images"
+        self.labels_path = self.dataset_path / "labels"
+        self.eps = eps
+
+    def validate(self) -> ValidationReport:
+        report = ValidationReport()
+        try:
+            nc = SubDatasetBuilder.load_dataset_info(self.dataset_path).nc
+        except FileNotFoundError as e:
+            report.errors.append(str(e))
+            nc = None
+        for path in (self.images_path, self.labels_path):
+            if not fm.is_dir(path):
+                report.errors.append(f"Directory not found: {path}")
+        if not report.is_valid:
+            return report
+
+        # keys are paths relative to images/ and labels/ without suffix,
+        # split subdirectories (images/train, ...) are matched as is
+        images: Dict[str, List[str]] = defaultdict(list)
+        for image_filename in self._list_files(self.images_path):
+            if Path(image_filename).suffix.lower() not in IMAGE_SUFFIXES:
+                report.warnings.append(f"Not an image: {image_filename}")
+                continue
+            images[str(Path(image_filename).with_suffix(""))].append(
+                image_filename
+            )
+        labels = {
+            str(Path(label_filename).with_suffix(""))
+            for label_filename in self._list_files(self.labels_path)
+            if label_filename.endswith(".txt")
+        }
+
+        for stem, image_filenames in images.items():
+            if len(image_filenames) > 1:
+                report.errors.append(
+                    "Duplicate images for one label: "
+                    f"{', '.join(sorted(image_filenames))}"
+                )
+            if stem not in labels:
+                report.warnings.append(
+                    f"Label not found: {image_filenames[0]}"
+                )
+        for stem in sorted(labels - images.keys()):
+            report.errors.append(f"Image not found: {stem}.txt")
+
+        for stem in sorted(labels):
+            report.errors.extend(
+                self._validate_label(self.labels_path / f"{stem}.txt", nc)
+            )
+        return report
+
+    @staticmethod
+    def _list_files(path: Path) -> List[str]:
+        return [
+            os.path.relpath(os.path.join(root, filename), path)
+            for root, _, filenames in os.walk(path)
+            for filename in filenames
+        ]
+
+    def _validate_label(self, label_path: Path, nc: int) -> List[str]:
+        errors = []
+        with open(label_path, "r") as fp:
+            for line_no, line in enumerate(fp, start=1):
+                values = line.split()
+                if not values:
+                    continue
+                where = f"{label_path.relative_to(self.labels_path)}:{line_no}"
+                if len(values) not in (5, 6, 9):
+                    errors.append(f"{where}: {len(values)} values in line")
+                    continue
+                try:
+                    class_id = int(values[0])
+                    coords = [float(value) for value in values[1:]]
+                except ValueError:
+                    errors.append(f"{where}: not a number")
+                    continue
+                if not 0 <= class_id < nc:
+                    errors.append(f"{where}: class id {class_id} out of range")
+                if len(values) == 6:
+                    # class_id xcn ycn wn hn r
+                    coords = coords[:4]
+                if any(
+                    not -self.eps <= value <= 1.0 + self.eps
+                    for value in coords
+                ):
+                    errors.append(f"{where}: coordinates out of [0, 1]")
+        return errors
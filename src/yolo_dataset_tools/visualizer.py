@@ -0,0 +1,265 @@
+"""AnnotationRenderer"""
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import math
+import os
+from pathlib import Path
+from PIL import Image, ImageDraw
+from tqdm import tqdm
+from typing import Iterable, List, Tuple
+
+from .filemanager import filemanager as fm
+
+
+PALETTE = (
+    (255, 56, 56),
+    (255, 157, 151),
+    (255, 112, 31),
+    (255, 178, 29),
+    (207, 210, 49),
+    (72, 249, 10),
+    (146, 204, 23),
+    (61, 219, 134),
+    (26, 147, 52),
+    (0, 212, 187),
+    (44, 153, 168),
+    (0, 194, 255),
+    (52, 69, 147),
+    (100, 115, 255),
+    (0, 24, 236),
+    (132, 56, 255),
+    (82, 0, 133),
+    (203, 56, 255),
+    (255, 149, 200),
+    (255, 55, 199),
+)
+
+
+def _render_thumbnail(
+    task: Tuple[Path, Path | None, Path, int, int, int],
+) -> Path:
+    """Process pool worker: reduced decode, resize and annotations drawing"""
+
+    image_path, label_path, thumbnail_path, size, line_width, quality = task
+    with Image.open(image_path) as img:
+        # JPEG: DCT scaling, decodes at 1/2, 1/4 or 1/8 of full resolution
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        img.thumbnail((size, size))
+
+    if label_path is not None and label_path.is_file():
+        width, height = img.size
+        draw = ImageDraw.Draw(img)
+        with open(label_path, "r") as fp:
+            for line in fp:
+                values = line.split()
+                if len(values) < 5:
+                    continue
+                color = PALETTE[int(values[0]) % len(PALETTE)]
+                coords = [float(value) for value in values[1:]]
+                if len(coords) == 8:
+                    # class_id x1n y1n x2n y2n x3n y3n x4n y4n
+                    polygon = [
+                        (coords[i] * width, coords[i + 1] * height)
+                        for i in range(0, 8, 2)
+                    ]
+                    draw.polygon(polygon, outline=color, width=line_width)
+                else:
+                    # class_id xcn ycn wn hn (r), r in radians, rotated
+                    # in pixels like the converter OBB corners
+                    xc, yc = coords[0] * width, coords[1] * height
+                    half_w, half_h = (
+                        coords[2] * width / 2,
+                        coords[3] * height / 2,
+                    )
+                    angle = coords[4] if len(coords) > 4 else 0.0
+                    cos_a, sin_a = math.cos(angle), math.sin(angle)
+                    polygon = [
+                        (
+                            xc + cos_a * x - sin_a * y,
+                            yc + sin_a * x + cos_a * y,
+                        )
+                        for x, y in (
+                            (-half_w, -half_h),
+                            (half_w, -half_h),
+                            (half_w, half_h),
+                            (-half_w, half_h),
+                        )
+                    ]
+                    draw.polygon(polygon, outline=color, width=line_width)
+
+    thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = thumbnail_path.with_suffix(f".{os.getpid()}.tmp")
+    img.save(tmp_path, format="JPEG", quality=quality)
+    os.replace(tmp_path, thumbnail_path)
+    return thumbnail_path
+
+
+class AnnotationRenderer:
+    """
+    ### Annotated thumbnails rendering
+
+    Thumbnails are rendered in a process pool and cached on disk by
+    image and label fingerprint, so repeated reviews of the same dataset
+    only render new or changed images.
+
+    Dataset schema:
+
+    dataset/
+        ├── images/
+        └── labels/
+    """
+
+    def __init__(
+        self,
+        dataset_path: str | Path,
+        cache_path: str | Path = None,
+        thumbnail_size: int = 320,
+        line_width: int = 2,
+        quality: int = 85,
+        max_workers: int = None,
+    ) -> None:
+        """
+        :param dataset_path: directory with images and labels folders
+        :param cache_path: thumbnails cache directory, default dataset/.thumbnails
+        :param thumbnail_size: max thumbnail side in pixels
+        """
+
+        if thumbnail_size <= 0:
+            raise ValueError("Thumbnail size must be positive")
+
+        self.dataset_path = fm.resolve_path(dataset_path)
+        self.images_path = self.dataset_path / "images"
+        self.labels_path = self.dataset_path / "labels"
+        self.cache_path = (
+            fm.resolve_path(cache_path)
+            if cache_path
+            else self.dataset_path / ".thumbnails"
+        )
+        self.thumbnail_size = thumbnail_size
+        self.line_width = line_width
+        self.quality = quality
+        self.max_workers = max_workers
+
+    def render(self, image_filenames: Iterable[str] = None) -> List[Path]:
+        """
+        :param image_filenames: images to render, paths relative to the images
+        folder (e.g. "train/x.jpg"), default all images of the dataset
+        including split subdirectories
+        :return: thumbnails paths in order of image_filenames, directories
+        and missing files are skipped
+        """
+
+        if image_filenames is None:
+            image_filenames = sorted(
+                os.path.relpath(os.path.join(root, filename), self.images_path)
+                for root, _, filenames in os.walk(self.images_path)
+                for filename in filenames
+            )
+
+        thumbnails: List[Path] = []
+        tasks = []
+        for image_filename in image_filenames:
+            image_path = self.images_path / image_filename
+            if not image_path.is_file():
+                continue
+            # images/<split>/x.jpg -> labels/<split>/x.txt
+            label_path = self.labels_path / Path(image_filename).with_suffix(
+                ".txt"
+            )
+            if not label_path.is_file():
+                label_path = None
+            thumbnail_path = self._get_thumbnail_path(image_path, label_path)
+            thumbnails.append(thumbnail_path)
+            if not thumbnail_path.is_file():
+                tasks.append(
+                    (
+                        image_path,
+                        label_path,
+                        thumbnail_path,
+                        self.thumbnail_size,
+                        self.line_width,
+                        self.quality,
+                    )
+                )
+
+        print(f"{len(thumbnails) - len(tasks)} thumbnails found in cache")
+        if tasks:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                for _ in tqdm(
+                    pool.map(_render_thumbnail, tasks, chunksize=16),
+                    total=len(tasks),
+                    desc="Rendered",
+                    leave=True,
+                ):
+                    pass
+        return thumbnails
+
+    def build_contact_sheets(
+        self,
+        thumbnails: List[Path],
+        output_path: str | Path,
+        columns: int = 8,
+        rows: int = 8,
+    ) -> List[Path]:
+        """
+        Tile thumbnails into contact sheets of columns x rows cells
+        :param output_path: contact sheets directory. Warning: directory will be cleaned!
+        """
+
+        if columns <= 0 or rows <= 0:
+            raise ValueError("Columns and rows must be positive")
+
+        output_path = fm.resolve_path(output_path)
+        fm.remove_dir(output_path)
+        fm.create_dir(output_path)
+
+        cell = self.thumbnail_size
+        per_sheet = columns * rows
+        sheets: List[Path] = []
+        for sheet_idx in tqdm(
+            range(math.ceil(len(thumbnails) / per_sheet)),
+            desc="Contact sheets",
+            leave=True,
+        ):
+            chunk = thumbnails[
+                sheet_idx * per_sheet : (sheet_idx + 1) * per_sheet
+            ]
+            sheet_rows = math.ceil(len(chunk) / columns)
+            sheet = Image.new("RGB", (columns * cell, sheet_rows * cell))
+            for idx, thumbnail_path in enumerate(chunk):
+                with Image.open(thumbnail_path) as thumbnail:
+                    row, column = divmod(idx, columns)
+                    sheet.paste(
+                        thumbnail,
+                        (
+                            column * cell + (cell - thumbnail.width) // 2,
+                            row * cell + (cell - thumbnail.height) // 2,
+                        ),
+                    )
+            sheet_path = output_path / f"sheet_{sheet_idx:04d}.jpg"
+            sheet.save(sheet_path, format="JPEG", quality=self.quality)
+            sheets.append(sheet_path)
+
+        print(f"{len(sheets)} contact sheets created: {output_path}")
+        return sheets
+
+    def _get_thumbnail_path(
+        self,
+        image_path: Path,
+        label_path: Path | None,
+    ) -> Path:
+        """Cache key: image path, size and mtime, label content, render params"""
+
+        stat = image_path.stat()
+        key = hashlib.sha1()
+        key.update(
+            f"{image_path}|{stat.st_size}|{stat.st_mtime_ns}|"
+            f"{self.thumbnail_size}|{self.line_width}|{self.quality}|".encode()
+        )
+        if label_path is not None:
+            with open(label_path, "rb") as fp:
+                key.update(fp.read())
+        digest = key.hexdigest()
+        return self.cache_path / digest[:2] / f"{digest}.jpg"
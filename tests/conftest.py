@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+
+# the package is not installed, tests import it from src/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+@pytest.fixture
+def make_dataset(tmp_path):
+    """
+    Factory of YOLO datasets: images/, labels/ and classes.txt
+    :return: make(labels, names, sizes, name) -> dataset path, labels are
+    {image_stem: annotation lines or None (no label file)}, sizes are
+    {image_stem: (width, height)}, 64x48 by default
+    """
+
+    from PIL import Image
+
+    def make(labels, names=("a", "b", "c"), sizes=None, name="dataset"):
+        dataset_path = tmp_path / name
+        (dataset_path / "images").mkdir(parents=True)
+        (dataset_path / "labels").mkdir()
+        (dataset_path / "classes.txt").write_text("\n".join(names))
+        for stem, lines in labels.items():
+            size = (sizes or {}).get(stem, (64, 48))
+            Image.new("RGB", size, (10, 20, 30)).save(
+                dataset_path / "images" / f"{stem}.jpg"
+            )
+            if lines is not None:
+                (dataset_path / "labels" / f"{stem}.txt").write_text(
+                    "\n".join(lines)
+                )
+        return dataset_path
+
+    return make
@@ -0,0 +1,61 @@
+"""Command line interface"""
+
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from yolo_dataset_tools import cli
+
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+HEAVY_MODULES = ("PIL", "yaml", "tqdm", "pydantic", "numpy")
+
+
+def _run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args],
+        env=dict(os.environ, PYTHONPATH=str(SRC)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_module_entry_point():
+    result = _run_python("-m", "yolo_dataset_tools", "--help")
+    for command in ("convert", "subset", "stats", "validate"):
+        assert command in result.stdout
+
+
+def test_lazy_imports():
+    code = (
+        "import json, sys\n"
+        "import yolo_dataset_tools.cli\n"
+        "import yolo_dataset_tools.subdataset_builder\n"
+        "import yolo_dataset_tools.converter.coco2yolo\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = _run_python("-c", code)
+    assert json.loads(result.stdout) == []
+
+
+def test_convert_rejects_tiling(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        yaml.safe_dump(
+            {
+                "convert": {
+                    "output": str(tmp_path / "yolo"),
+                    "splits": {},
+                    "tiling": {"tile_size": 640},
+                }
+            }
+        )
+    )
+    with pytest.raises(KeyError, match="subset"):
+        cli.main(["convert", str(config_path)])
@@ -0,0 +1,119 @@
+"""COCO to YOLO conversion"""
+
+import json
+
+import pytest
+import yaml
+from PIL import Image
+
+from yolo_dataset_tools.converter.coco2yolo import Coco2YoloConverter
+from yolo_dataset_tools.converter.multisplit import (
+    CocoSplit,
+    MultiSplitCoco2YoloConverter,
+)
+
+
+# class ids are neither contiguous nor shared between the files
+TRAIN_CLASSES = {3: "cat", 7: "dog"}
+VAL_CLASSES = {1: "dog", 2: "bird"}
+
+
+def _make_coco(path, name, classes, size=(200, 100)):
+    """COCO file with one image per class, one box per image"""
+
+    images_path = path / f"{name}_images"
+    images_path.mkdir(parents=True)
+    coco = {
+        "classes": [
+            {"id": class_id, "name": class_name}
+            for class_id, class_name in classes.items()
+        ],
+        "images": [],
+        "annotations": [],
+    }
+    for image_id, class_id in enumerate(classes):
+        file_name = f"{name}{image_id}.jpg"
+        Image.new("RGB", size).save(images_path / file_name)
+        coco["images"].append(
+            {
+                "id": image_id,
+                "width": size[0],
+                "height": size[1],
+                "file_name": file_name,
+            }
+        )
+        coco["annotations"].append(
+            {
+                "id": image_id,
+                "image_id": image_id,
+                "class_id": class_id,
+                "bbox": [20, 10, 40, 20],
+            }
+        )
+    json_path = path / f"{name}.json"
+    json_path.write_text(json.dumps(coco))
+    return CocoSplit(name=name, json_path=json_path, images_path=images_path)
+
+
+def _labels(dataset_path, split):
+    """{class_name: yolo class id} of the split labels"""
+
+    names = (dataset_path / "classes.txt").read_text().splitlines()
+    return sorted(
+        (names[int(line.split()[0])], int(line.split()[0]))
+        for label_path in (dataset_path / "labels" / split).iterdir()
+        for line in label_path.read_text().splitlines()
+    )
+
+
+def test_build_class_map():
+    names, class_maps = Coco2YoloConverter.build_class_map(
+        [TRAIN_CLASSES, VAL_CLASSES]
+    )
+    assert names == ["cat", "dog", "bird"]
+    assert class_maps == [{3: 0, 7: 1}, {1: 1, 2: 2}]
+
+
+def test_multisplit(tmp_path):
+    splits = [
+        _make_coco(tmp_path, "train", TRAIN_CLASSES),
+        _make_coco(tmp_path, "val", VAL_CLASSES),
+    ]
+    dataset_path = tmp_path / "dataset"
+
+    MultiSplitCoco2YoloConverter("yolo", dataset_path, splits).run()
+
+    assert (dataset_path / "classes.txt").read_text().splitlines() == [
+        "cat",
+        "dog",
+        "bird",
+    ]
+    # dog has one id in both splits
+    assert _labels(dataset_path, "train") == [("cat", 0), ("dog", 1)]
+    assert _labels(dataset_path, "val") == [("bird", 2), ("dog", 1)]
+    assert sorted(
+        path.name for path in (dataset_path / "images" / "val").iterdir()
+    ) == ["val0.jpg", "val1.jpg"]
+    assert (dataset_path / "labels" / "train" / "train0.txt").read_text() == (
+        "0 0.2 0.2 0.2 0.2\n"
+    )
+
+    data_yaml = yaml.safe_load((dataset_path / "data.yaml").read_text())
+    assert data_yaml["train"] == "images/train"
+    assert data_yaml["val"] == "images/val"
+    assert not data_yaml["test"]
+    assert data_yaml["nc"] == 3
+    assert data_yaml["names"] == ["cat", "dog", "bird"]
+
+
+@pytest.mark.parametrize(
+    "names, error",
+    [(["train", "train"], "Duplicate"), (["train", "valid"], "Unknown")],
+)
+def test_multisplit_split_names(tmp_path, names, error):
+    splits = [
+        CocoSplit(name=name, json_path="x.json", images_path="images")
+        for name in names
+    ]
+    with pytest.raises(ValueError, match=error):
+        MultiSplitCoco2YoloConverter("yolo", tmp_path / "dataset", splits)
@@ -0,0 +1,218 @@
+"""FilterCache and the cached filter chains of SubDatasetBuilder"""
+
+import pytest
+
+from yolo_dataset_tools.dataset_filters import (
+    LANDSCAPE,
+    PORTRAIT,
+    BoxSizeFilter,
+    ClassFilter,
+    OrientationFilter,
+    RelBoxSizeRanges,
+)
+from yolo_dataset_tools.filter_cache import FilterCache
+from yolo_dataset_tools.models.yolo import ImageInfo
+from yolo_dataset_tools.subdataset_builder import SubDatasetBuilder
+
+
+LABELS = {
+    f"img{i}": [
+        "0 0.5 0.5 0.1 0.1",
+        f"1 0.5 0.5 0.{i + 1} 0.{i + 1}",
+        "2 0.5 0.5 0.2 0.2",
+    ]
+    for i in range(6)
+}
+
+
+def _box_filter(wn_max):
+    return BoxSizeFilter(
+        [
+            RelBoxSizeRanges("a", wn_max=wn_max),
+            RelBoxSizeRanges("b", wn_max=wn_max),
+        ]
+    )
+
+
+def _count_applies(monkeypatch, filter_class):
+    calls = []
+    apply = filter_class.apply
+
+    def counting_apply(self, annotation_lines, image_info):
+        calls.append(filter_class.__name__)
+        return apply(self, annotation_lines, image_info)
+
+    monkeypatch.setattr(filter_class, "apply", counting_apply)
+    return calls
+
+
+def _build(dataset_path, cache_path, subset_path, filters):
+    with FilterCache(cache_path) as cache:
+        builder = SubDatasetBuilder(dataset_path, cache=cache)
+        for filter in filters:
+            builder.add_filter(filter)
+        builder.build_subset(subset_path)
+    return cache
+
+
+def test_last_filter_changed(make_dataset, tmp_path, monkeypatch):
+    dataset_path = make_dataset(LABELS)
+    cache_path = tmp_path / "cache.sqlite"
+    n = len(LABELS)
+
+    cache = _build(
+        dataset_path,
+        cache_path,
+        tmp_path / "subset",
+        [ClassFilter(["a", "b"]), _box_filter(0.35)],
+    )
+    # both prefixes are looked up and computed for every image
+    assert (cache.hits, cache.misses) == (0, 2 * n)
+
+    class_applies = _count_applies(monkeypatch, ClassFilter)
+    box_applies = _count_applies(monkeypatch, BoxSizeFilter)
+    cache = _build(
+        dataset_path,
+        cache_path,
+        tmp_path / "subset",
+        [ClassFilter(["a", "b"]), _box_filter(0.45)],
+    )
+    # ClassFilter results are taken from the cache
+    assert (cache.hits, cache.misses) == (n, n)
+    assert class_applies == []
+    assert len(box_applies) == n
+
+    labels = sorted((tmp_path / "subset" / "labels").iterdir())
+    assert len(labels) == n
+    # a and b boxes narrower than 0.45
+    assert labels[3].read_text().splitlines() == [
+        "0 0.5 0.5 0.1 0.1",
+        "1 0.5 0.5 0.4 0.4",
+    ]
+    assert labels[4].read_text().splitlines() == ["0 0.5 0.5 0.1 0.1"]
+
+    # nothing changed: the whole chain is a hit
+    box_applies.clear()
+    cache = _build(
+        dataset_path,
+        cache_path,
+        tmp_path / "subset",
+        [ClassFilter(["a", "b"]), _box_filter(0.45)],
+    )
+    assert (cache.hits, cache.misses) == (n, 0)
+    assert box_applies == []
+
+
+def test_chains_share_prefix(make_dataset, tmp_path, monkeypatch):
+    dataset_path = make_dataset(LABELS)
+    n = len(LABELS)
+    class_applies = _count_applies(monkeypatch, ClassFilter)
+
+    with FilterCache(tmp_path / "cache.sqlite") as cache:
+        builder = SubDatasetBuilder(dataset_path, cache=cache)
+        builder.add_subset(
+            "classes", tmp_path / "classes", [ClassFilter(["a", "b"])]
+        )
+        builder.add_subset(
+            "landscape",
+            tmp_path / "landscape",
+            [ClassFilter(["a", "b"]), OrientationFilter(LANDSCAPE)],
+        )
+        builder.build_subsets()
+
+        # the second chain takes its ClassFilter prefix from the first one
+        assert (cache.hits, cache.misses) == (n, 2 * n)
+        assert len(class_applies) == n
+        (entries,) = cache._db.execute(
+            "SELECT COUNT(*) FROM entries"
+        ).fetchone()
+        assert entries == 2 * n
+
+
+def test_lru_eviction(tmp_path):
+    image = ImageInfo(width=64, height=48)
+    with FilterCache(tmp_path / "cache.sqlite", max_entries=3) as cache:
+        keys = [cache.make_key("prefix", str(i), image) for i in range(5)]
+        for key in keys[:3]:
+            cache.put(key, ["0 0.5 0.5 0.1 0.1"])
+        # key 0 becomes the most recently used
+        assert cache.get(keys[0])[0]
+        cache.put(keys[3], [])
+        cache.put(keys[4], [])
+        cache.flush()
+
+        assert [cache.get(key)[0] for key in keys] == [
+            True,
+            False,
+            False,
+            True,
+            True,
+        ]
+
+
+def test_lru_state_persists(tmp_path):
+    image = ImageInfo(width=64, height=48)
+    cache_path = tmp_path / "cache.sqlite"
+    with FilterCache(cache_path) as cache:
+        keys = [cache.make_key("prefix", str(i), image) for i in range(3)]
+        for key in keys:
+            cache.put(key, [])
+        cache.get(keys[0])
+
+    # access times survive reopening, the oldest entry is key 1
+    with FilterCache(cache_path, max_entries=2) as cache:
+        cache.flush()
+        assert [cache.get(key)[0] for key in keys] == [True, False, True]
+
+
+def test_dropped_annotations_read_as_empty(make_dataset, tmp_path):
+    image = ImageInfo(width=64, height=48)
+    # OrientationFilter drops landscape images with None
+    assert (
+        OrientationFilter(PORTRAIT).apply(["0 0.5 0.5 0.1 0.1"], image) is None
+    )
+    with FilterCache(tmp_path / "cache.sqlite") as cache:
+        key = cache.make_key("prefix", "label", image)
+        cache.put(key, None)
+        assert cache.get(key) == (True, [])
+
+    # cached drops are not written to the subset
+    dataset_path = make_dataset(
+        {"wide": ["0 0.5 0.5 0.1 0.1"], "tall": ["0 0.5 0.5 0.1 0.1"]},
+        sizes={"tall": (48, 64)},
+    )
+    for _ in range(2):
+        cache = _build(
+            dataset_path,
+            tmp_path / "cache.sqlite",
+            tmp_path / "portrait",
+            [OrientationFilter(PORTRAIT)],
+        )
+        labels = sorted(
+            path.name for path in (tmp_path / "portrait" / "labels").iterdir()
+        )
+        assert labels == ["tall.txt"]
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_config_hash():
+    assert ClassFilter(["a", "b"]).config_hash() == (
+        ClassFilter(["a", "b"]).config_hash()
+    )
+    assert ClassFilter(["a", "b"]).config_hash() != (
+        ClassFilter(["b", "a"]).config_hash()
+    )
+    assert _box_filter(0.3).config_hash() == _box_filter(0.3).config_hash()
+    assert _box_filter(0.3).config_hash() != _box_filter(0.4).config_hash()
+    assert OrientationFilter(PORTRAIT).config_hash() != (
+        OrientationFilter(LANDSCAPE).config_hash()
+    )
+    # equal parameters of different filters
+    assert OrientationFilter(PORTRAIT).config_hash() != (
+        ClassFilter(["a"]).config_hash()
+    )
+
+
+def test_max_entries_positive(tmp_path):
+    with pytest.raises(ValueError):
+        FilterCache(tmp_path / "cache.sqlite", max_entries=0)
@@ -0,0 +1,99 @@
+"""ResizeTransform"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from yolo_dataset_tools.models.yolo import ImageInfo
+from yolo_dataset_tools.transforms import ResizeTransform
+from yolo_dataset_tools.transforms.base import parse_annotations
+
+
+IMAGE = ImageInfo(width=4000, height=3000)
+
+
+def test_geometry():
+    width, height, pad_x, pad_y, out_info = ResizeTransform(
+        640, letterbox=True
+    ).get_geometry(IMAGE)
+    assert (width, height, pad_x, pad_y) == (640, 480, 0, 80)
+    assert (out_info.width, out_info.height) == (640, 640)
+
+    width, height, pad_x, pad_y, out_info = ResizeTransform(640).get_geometry(
+        IMAGE
+    )
+    assert (width, height, pad_x, pad_y) == (640, 480, 0, 0)
+    assert (out_info.width, out_info.height) == (640, 480)
+
+    # small images are not upscaled by default
+    small = ImageInfo(width=320, height=240)
+    assert ResizeTransform(640).get_geometry(small)[:2] == (320, 240)
+    assert ResizeTransform(640, allow_upscale=True).get_geometry(small)[
+        :2
+    ] == (640, 480)
+
+
+def test_letterbox_boxes():
+    lines = ResizeTransform(640, letterbox=True).transform_annotations(
+        ["0 0.5 0.5 0.1 0.1", "1 0.0 0.0 0.2 0.4 0.5"], IMAGE
+    )
+    assert lines == [
+        "0 0.500000 0.500000 0.100000 0.075000",
+        "1 0.000000 0.125000 0.200000 0.300000 0.5",
+    ]
+
+
+def test_letterbox_obb():
+    lines = ResizeTransform(640, letterbox=True).transform_annotations(
+        [
+            "2 0.0 0.0 1.0 0.0 1.0 1.0 0.0 1.0",
+            "2 0.2 0.1 0.4 0.3 0.2 0.5 0.0 0.3",
+        ],
+        IMAGE,
+    )
+    _, coords, _ = parse_annotations(lines)
+    np.testing.assert_allclose(
+        coords[0], [0, 0.125, 1, 0.125, 1, 0.875, 0, 0.875], atol=1e-6
+    )
+    ys = coords[:, 1::2]
+    assert (ys >= 0.125).all() and (ys <= 0.875).all()
+    np.testing.assert_allclose(coords[1, ::2], [0.2, 0.4, 0.2, 0.0], atol=1e-6)
+
+
+def test_no_letterbox_keeps_lines():
+    lines = ["0 0.5 0.5 0.1 0.1"]
+    assert ResizeTransform(640).transform_annotations(lines, IMAGE) is lines
+
+
+def test_apply(tmp_path):
+    image_path = tmp_path / "image.jpg"
+    Image.new("RGB", (400, 300), (200, 0, 0)).save(image_path)
+
+    count = ResizeTransform(64, letterbox=True).apply(
+        image_path,
+        ["0 0.5 0.5 0.1 0.1"],
+        ImageInfo(width=400, height=300),
+        tmp_path / "images",
+        tmp_path / "labels",
+    )
+
+    assert count == 1
+    with Image.open(tmp_path / "images" / "image.jpg") as img:
+        assert img.size == (64, 64)
+        # padding rows at the top, the image in the middle
+        assert img.getpixel((32, 2)) == pytest.approx((114, 114, 114), abs=8)
+        assert img.getpixel((32, 32))[0] > 150
+    assert (tmp_path / "labels" / "image.txt").read_text().split() == [
+        "0",
+        "0.500000",
+        "0.500000",
+        "0.100000",
+        "0.075000",
+    ]
+
+
+def test_incorrect_size():
+    with pytest.raises(ValueError):
+        ResizeTransform(0)
+    with pytest.raises(ValueError):
+        ResizeTransform((640, 480, 3))
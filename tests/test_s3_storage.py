@@ -0,0 +1,264 @@
+"""S3 storage against a local moto server, skipped without boto3 and moto"""
+
+import io
+import json
+import socket
+
+import pytest
+
+pytest.importorskip("boto3")
+moto_server = pytest.importorskip("moto.server")
+
+from PIL import Image
+
+from yolo_dataset_tools.converter.multisplit import (
+    CocoSplit,
+    MultiSplitCoco2YoloConverter,
+)
+from yolo_dataset_tools.dataset_filters import ClassFilter
+from yolo_dataset_tools.filemanager import FileManager
+from yolo_dataset_tools.sampling import ClassBalancedSampler
+from yolo_dataset_tools.storage import S3Storage
+from yolo_dataset_tools.storage.base import HEADER_SIZE
+from yolo_dataset_tools.subdataset_builder import SubDatasetBuilder
+
+
+BUCKET = "datasets"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def endpoint_url():
+    port = _free_port()
+    server = moto_server.ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def storage(endpoint_url, request):
+    storage = S3Storage(
+        BUCKET,
+        prefix=request.node.name,
+        endpoint_url=endpoint_url,
+        max_pool_connections=4,
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    try:
+        storage.client.create_bucket(Bucket=BUCKET)
+    except storage.client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    return storage
+
+
+def _jpeg(size, **save_kwargs) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (10, 20, 30)).save(buf, "JPEG", **save_kwargs)
+    return buf.getvalue()
+
+
+def test_list_dir_pagination(storage):
+    storage.LIST_PAGE_SIZE = 3
+    fm = FileManager(storage=storage)
+    for i in range(10):
+        fm.write_text(f"ds/labels/{i:02d}.txt", "0 0.5 0.5 0.1 0.1")
+    for split in ("train", "val"):
+        fm.write_text(f"ds/images/{split}/a.txt", "")
+    fm.write_text("ds/classes.txt", "car")
+
+    assert sorted(fm.list_dir("ds/labels")) == [
+        f"{i:02d}.txt" for i in range(10)
+    ]
+    assert sorted(fm.list_dir("ds")) == ["classes.txt", "images", "labels"]
+    assert sorted(fm.list_dir("ds/images")) == ["train", "val"]
+
+
+def test_image_sizes_ranged_and_full_reads(storage):
+    fm = FileManager(storage=storage)
+    small = _jpeg((320, 240))
+    # EXIF and ICC blocks move the JPEG frame header past HEADER_SIZE
+    exif = Image.Exif()
+    exif[0x010E] = "x" * 60000
+    large = _jpeg((640, 480), exif=exif, icc_profile=b"\0" * 40000)
+    assert len(large) > HEADER_SIZE
+    fm.storage.write_bytes(fm.resolve_path("images/small.jpg"), small)
+    fm.storage.write_bytes(fm.resolve_path("images/large.jpg"), large)
+
+    full_reads = []
+    read_bytes = storage.read_bytes
+
+    def counting_read_bytes(path):
+        full_reads.append(path.name)
+        return read_bytes(path)
+
+    storage.read_bytes = counting_read_bytes
+    assert fm.image_sizes(["images/small.jpg", "images/large.jpg"]) == [
+        (320, 240),
+        (640, 480),
+    ]
+    assert full_reads == ["large.jpg"]
+
+
+def test_read_many_missing_files(storage):
+    fm = FileManager(storage=storage)
+    fm.write_text("labels/a.txt", "0 0.5 0.5 0.1 0.1")
+    assert fm.read_many(["labels/a.txt", "labels/b.txt"]) == [
+        b"0 0.5 0.5 0.1 0.1",
+        None,
+    ]
+
+
+def test_copy_dir(storage):
+    fm = FileManager(storage=storage)
+    for name in ("images/a.jpg", "images/b.jpg", "labels/a.txt"):
+        fm.write_text(f"src/{name}", name)
+
+    fm.copy_dir("src", "dst")
+
+    assert sorted(fm.list_dir("dst")) == ["images", "labels"]
+    assert sorted(fm.list_dir("dst/images")) == ["a.jpg", "b.jpg"]
+    assert fm.read_text("dst/labels/a.txt") == "labels/a.txt"
+    # server-side copy keeps the source
+    assert fm.is_file("src/images/a.jpg")
+    with pytest.raises(FileNotFoundError):
+        storage.copy(fm.resolve_path("missing"), fm.resolve_path("dst2"))
+
+
+def test_remove_dir(storage):
+    storage.DELETE_BATCH = 2
+    fm = FileManager(storage=storage)
+    for i in range(5):
+        fm.write_text(f"subset/images/{i}.jpg", "")
+    fm.write_text("subset_other/keep.txt", "")
+
+    fm.remove_dir("subset")
+
+    assert not fm.is_dir("subset")
+    assert fm.is_file("subset_other/keep.txt")
+
+
+def test_remove_dir_failed_deletes(storage):
+    fm = FileManager(storage=storage)
+    fm.write_text("subset/a.txt", "")
+    storage.client.delete_objects = lambda **kwargs: {
+        "Errors": [{"Key": "subset/a.txt", "Code": "AccessDenied"}]
+    }
+
+    with pytest.raises(RuntimeError, match="AccessDenied"):
+        fm.remove_dir("subset")
+
+
+def _write_dataset(fm, labels):
+    for stem, lines in labels.items():
+        fm.storage.write_bytes(
+            fm.resolve_path(f"ds/images/{stem}.jpg"), _jpeg((64, 48))
+        )
+        fm.write_text(f"ds/labels/{stem}.txt", "\n".join(lines))
+    fm.write_text("ds/classes.txt", "a\nb\nc")
+
+
+def test_build_sampled_subset(storage, make_dataset, tmp_path):
+    labels = {
+        f"img{i:02d}": [f"{i % 3} 0.5 0.5 0.1 0.1", "2 0.5 0.5 0.2 0.2"]
+        for i in range(12)
+    }
+    fm = FileManager(storage=storage)
+    _write_dataset(fm, labels)
+
+    def sampler():
+        return ClassBalancedSampler(quotas={"a": 2, "b": 2}, seed=3)
+
+    builder = SubDatasetBuilder("ds", filemanager=fm)
+    builder.add_filter(ClassFilter(["a", "b"]))
+    builder.build_subset("subset", sampler=sampler())
+
+    # the same dataset and sampler on local files
+    local = SubDatasetBuilder(make_dataset(labels))
+    local.add_filter(ClassFilter(["a", "b"]))
+    local.build_subset(tmp_path / "subset", sampler=sampler())
+
+    expected = sorted(
+        path.name for path in (tmp_path / "subset" / "labels").iterdir()
+    )
+    assert len(expected) == 4
+    assert sorted(fm.list_dir("subset/labels")) == expected
+    assert sorted(fm.list_dir("subset/images")) == [
+        name.replace(".txt", ".jpg") for name in expected
+    ]
+    for name in expected:
+        assert (
+            fm.read_text(f"subset/labels/{name}")
+            == (tmp_path / "subset" / "labels" / name).read_text()
+        )
+    assert fm.read_text("subset/classes.txt") == "a\nb"
+
+
+def test_convert_coco(storage):
+    fm = FileManager(storage=storage)
+    splits = []
+    for name, classes in (
+        ("train", {3: "cat", 7: "dog"}),
+        ("val", {1: "dog"}),
+    ):
+        coco = {
+            "classes": [
+                {"id": class_id, "name": class_name}
+                for class_id, class_name in classes.items()
+            ],
+            "images": [],
+            "annotations": [],
+        }
+        for image_id, class_id in enumerate(classes):
+            file_name = f"{name}{image_id}.jpg"
+            fm.storage.write_bytes(
+                fm.resolve_path(f"coco/images/{file_name}"), _jpeg((200, 100))
+            )
+            coco["images"].append(
+                {
+                    "id": image_id,
+                    "width": 200,
+                    "height": 100,
+                    "file_name": file_name,
+                }
+            )
+            coco["annotations"].append(
+                {
+                    "id": image_id,
+                    "image_id": image_id,
+                    "class_id": class_id,
+                    "bbox": [20, 10, 40, 20],
+                }
+            )
+        fm.write_text(f"coco/{name}.json", json.dumps(coco))
+        splits.append(
+            CocoSplit(
+                name=name,
+                json_path=f"coco/{name}.json",
+                images_path="coco/images",
+            )
+        )
+
+    MultiSplitCoco2YoloConverter(
+        "yolo", "yolo", splits, link_mode="hardlink", filemanager=fm
+    ).run()
+
+    assert fm.read_text("yolo/classes.txt") == "cat\ndog"
+    assert "train: images/train" in fm.read_text("yolo/data.yaml")
+    assert sorted(fm.list_dir("yolo/images/train")) == [
+        "train0.jpg",
+        "train1.jpg",
+    ]
+    assert fm.read_text("yolo/labels/train/train1.txt") == (
+        "1 0.2 0.2 0.2 0.2\n"
+    )
+    assert fm.read_text("yolo/labels/val/val0.txt") == "1 0.2 0.2 0.2 0.2\n"
+    # source images are kept
+    assert fm.is_file("coco/images/val0.jpg")
@@ -0,0 +1,154 @@
+"""ClassBalancedSampler"""
+
+import random
+
+import pytest
+
+from yolo_dataset_tools.models.yolo import DatasetInfo
+from yolo_dataset_tools.sampling import (
+    IMAGES,
+    INSTANCES,
+    ClassBalancedSampler,
+)
+
+
+INFO = DatasetInfo(
+    train="images/train",
+    val="images/val",
+    test="",
+    nc=3,
+    names=["car", "person", "bike"],
+)
+
+
+def _dataset(n=300):
+    """[(item_id, annotation_lines), ...] with 1-5 instances of 1-3 classes"""
+
+    rng = random.Random(42)
+    items = []
+    for i in range(n):
+        lines = [
+            f"{rng.randrange(3)} 0.5 0.5 0.1 0.1"
+            for _ in range(rng.randint(1, 5))
+        ]
+        items.append((f"{i:04d}.jpg", lines))
+    return items
+
+
+def _sampler(**kwargs):
+    kwargs.setdefault("quotas", {"car": 20, "person": 15, "bike": 10})
+    sampler = ClassBalancedSampler(**kwargs)
+    sampler.set_rules(INFO)
+    return sampler
+
+
+def _run(items, **kwargs):
+    sampler = _sampler(**kwargs)
+    for item_id, lines in items:
+        sampler.offer(item_id, lines, payload=len(lines))
+    return sampler
+
+
+def test_deterministic_with_seed():
+    items = _dataset()
+    first = _run(items, seed=1).selected()
+    assert first == _run(items, seed=1).selected()
+    assert first != _run(items, seed=2).selected()
+    assert [item_id for item_id, _ in first] == sorted(
+        item_id for item_id, _ in first
+    )
+
+
+@pytest.mark.parametrize("unit", [IMAGES, INSTANCES])
+def test_offer_order_independent(unit):
+    items = _dataset()
+    shuffled = items[:]
+    random.Random(0).shuffle(shuffled)
+
+    selected = _run(items, unit=unit).selected()
+    assert selected
+    assert selected == _run(items[::-1], unit=unit).selected()
+    assert selected == _run(shuffled, unit=unit).selected()
+
+
+@pytest.mark.parametrize("unit", [IMAGES, INSTANCES])
+def test_quotas(unit):
+    items = dict(_dataset())
+    sampler = _run(items.items(), unit=unit)
+    for class_id, quota in sampler.class_quotas.items():
+        ids = {item_id for _, item_id, _, _ in sampler.reservoirs[class_id]}
+        if unit == IMAGES:
+            assert len(ids) == quota
+        else:
+            instances = sum(
+                line.startswith(f"{class_id} ")
+                for item_id in ids
+                for line in items[item_id]
+            )
+            assert quota - 5 < instances <= quota
+
+
+@pytest.mark.parametrize("unit", [IMAGES, INSTANCES])
+def test_merge_shards(unit):
+    items = _dataset()
+    expected = _run(items, unit=unit).selected()
+
+    shards = [_run(items[i::4], unit=unit) for i in range(4)]
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    assert merged.selected() == expected
+
+    # overlapping shards offer some images twice
+    overlapping = _run(items[:200], unit=unit).merge(
+        _run(items[100:], unit=unit)
+    )
+    assert overlapping.selected() == expected
+
+
+def test_from_distribution():
+    sampler = ClassBalancedSampler.from_distribution(
+        10, {"car": 1, "person": 1, "bike": 1}
+    )
+    # round half to even: 3.33 -> 3
+    assert sampler.quotas == {"car": 3, "person": 3, "bike": 3}
+
+    sampler = ClassBalancedSampler.from_distribution(
+        1000, {"car": 0.5, "person": 0.3, "bike": 0.2}, unit=INSTANCES
+    )
+    assert sampler.quotas == {"car": 500, "person": 300, "bike": 200}
+    assert sampler.unit == INSTANCES
+
+    with pytest.raises(ValueError):
+        ClassBalancedSampler.from_distribution(0, {"car": 1})
+    with pytest.raises(ValueError):
+        ClassBalancedSampler.from_distribution(10, {"car": 0})
+
+
+def test_zero_quota_class():
+    sampler = _run(
+        _dataset(), quotas={"car": 10, "person": 0}, default_quota=None
+    )
+    assert set(sampler.class_quotas) == {0}
+    assert set(sampler.reservoirs) == {0}
+    assert len(sampler.selected()) == 10
+
+
+def test_unknown_class_name():
+    sampler = ClassBalancedSampler(quotas={"truck": 10})
+    with pytest.raises(NameError, match="truck"):
+        sampler.set_rules(INFO)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"seed": 1},
+        {"unit": INSTANCES},
+        {"weighting": INSTANCES},
+        {"quotas": {"car": 20, "person": 15, "bike": 11}},
+    ],
+)
+def test_merge_different_rules(kwargs):
+    with pytest.raises(ValueError, match="different rules"):
+        _sampler().merge(_sampler(**kwargs))
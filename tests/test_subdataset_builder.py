@@ -0,0 +1,174 @@
+"""SubDatasetBuilder"""
+
+import pytest
+from PIL import Image
+
+from yolo_dataset_tools.dataset_filters import (
+    LANDSCAPE,
+    BoxSizeFilter,
+    ClassFilter,
+    OrientationFilter,
+    RelBoxSizeRanges,
+)
+from yolo_dataset_tools.filemanager import filemanager as fm
+from yolo_dataset_tools.subdataset_builder import SubDatasetBuilder
+from yolo_dataset_tools.transforms import ResizeTransform, TileTransform
+
+
+LABELS = {
+    "img0": ["0 0.5 0.5 0.1 0.1", "1 0.5 0.5 0.3 0.3"],
+    "img1": ["1 0.5 0.5 0.1 0.1", "2 0.5 0.5 0.6 0.6"],
+    "img2": ["2 0.5 0.5 0.2 0.2"],
+    "img3": ["0 0.5 0.5 0.5 0.5"],
+    "img4": None,
+}
+SIZES = {"img1": (48, 64), "img3": (48, 64)}
+
+
+def _chains():
+    """{name: filters factory}, instances are not shared between chains"""
+
+    return {
+        "ab": lambda: [ClassFilter(["b", "a"])],
+        "small": lambda: [
+            BoxSizeFilter(
+                [
+                    RelBoxSizeRanges("a", wn_max=0.4),
+                    RelBoxSizeRanges("c", wn_max=0.4),
+                ]
+            )
+        ],
+        "landscape": lambda: [
+            ClassFilter(["c", "b"]),
+            OrientationFilter(LANDSCAPE),
+        ],
+    }
+
+
+def _tree(path):
+    """{relative path: file content}"""
+
+    return {
+        str(file.relative_to(path)): file.read_bytes()
+        for file in sorted(path.rglob("*"))
+        if file.is_file()
+    }
+
+
+def _record_paths(monkeypatch, method, batch=True):
+    """:return: paths passed to the filemanager method"""
+
+    paths = []
+    fm_method = getattr(fm, method)
+
+    def recording(path_or_paths, *args, **kwargs):
+        paths.extend(path_or_paths if batch else [path_or_paths])
+        return fm_method(path_or_paths, *args, **kwargs)
+
+    monkeypatch.setattr(fm, method, recording)
+    return paths
+
+
+def test_build_subsets_matches_build_subset(make_dataset, tmp_path):
+    dataset_path = make_dataset(LABELS, sizes=SIZES)
+
+    builder = SubDatasetBuilder(dataset_path)
+    for name, filters in _chains().items():
+        builder.add_subset(name, tmp_path / "fan_out" / name, filters())
+    builder.build_subsets()
+
+    for name, filters in _chains().items():
+        builder = SubDatasetBuilder(dataset_path)
+        for filter in filters():
+            builder.add_filter(filter)
+        builder.build_subset(tmp_path / "single" / name)
+
+        fan_out = _tree(tmp_path / "fan_out" / name)
+        assert fan_out
+        assert fan_out == _tree(tmp_path / "single" / name)
+
+    ab = _tree(tmp_path / "fan_out" / "ab")
+    assert ab["classes.txt"] == b"b\na"
+    assert ab["labels/img0.txt"] == b"1 0.5 0.5 0.1 0.1\n0 0.5 0.5 0.3 0.3"
+    assert sorted(_tree(tmp_path / "fan_out" / "landscape")) == [
+        "classes.txt",
+        "data.yaml",
+        "images/img0.jpg",
+        "images/img2.jpg",
+        "labels/img0.txt",
+        "labels/img2.txt",
+    ]
+
+
+def test_dataset_read_once(make_dataset, tmp_path, monkeypatch):
+    dataset_path = make_dataset(LABELS, sizes=SIZES)
+    builder = SubDatasetBuilder(dataset_path)
+    for name, filters in _chains().items():
+        builder.add_subset(name, tmp_path / name, filters())
+
+    listed = _record_paths(monkeypatch, "list_dir", batch=False)
+    sized = _record_paths(monkeypatch, "image_sizes")
+    read = _record_paths(monkeypatch, "read_many")
+    builder.build_subsets()
+
+    images = sorted(f"{stem}.jpg" for stem in LABELS)
+    assert listed == [dataset_path / "images"]
+    assert sorted(path.name for path in sized) == images
+    assert sorted(path.name for path in read) == sorted(
+        f"{stem}.txt" for stem in LABELS
+    )
+
+
+def test_add_subset_duplicates(make_dataset, tmp_path):
+    builder = SubDatasetBuilder(make_dataset(LABELS))
+    builder.add_subset("ab", tmp_path / "ab", [ClassFilter(["a", "b"])])
+
+    with pytest.raises(ValueError, match="exists"):
+        builder.add_subset("ab", tmp_path / "other", [ClassFilter(["a"])])
+    with pytest.raises(ValueError, match="exists"):
+        builder.add_subset("other", tmp_path / "ab", [ClassFilter(["a"])])
+
+
+def test_chains_class_names_independent(make_dataset, tmp_path):
+    builder = SubDatasetBuilder(make_dataset(LABELS))
+    builder.add_subset("c", tmp_path / "c", [ClassFilter(["c"])])
+    builder.add_subset(
+        "small",
+        tmp_path / "small",
+        [BoxSizeFilter([RelBoxSizeRanges("a", wn_max=0.4)])],
+    )
+
+    assert [chain.info.names for chain in builder.subsets] == [
+        ["c"],
+        ["a", "b", "c"],
+    ]
+    assert builder.dataset_info.names == ["a", "b", "c"]
+    builder.build_subsets()
+    assert (tmp_path / "small" / "classes.txt").read_text() == "a\nb\nc"
+    assert (tmp_path / "small" / "labels" / "img0.txt").read_text() == (
+        "0 0.5 0.5 0.1 0.1"
+    )
+
+
+def test_empty_filters(make_dataset, tmp_path):
+    dataset_path = make_dataset(LABELS)
+    builder = SubDatasetBuilder(dataset_path)
+    builder.add_subset("copy", tmp_path / "copy", [])
+    with pytest.raises(RuntimeError, match="filters list is empty"):
+        builder.build_subsets()
+    with pytest.raises(RuntimeError, match="filters list is empty"):
+        SubDatasetBuilder(dataset_path).build_subset(tmp_path / "copy")
+
+    # resize only
+    builder.build_subsets(transform=ResizeTransform(32, letterbox=True))
+    images = sorted((tmp_path / "copy" / "images").iterdir())
+    assert [path.stem for path in images] == ["img0", "img1", "img2", "img3"]
+    with Image.open(images[0]) as img:
+        assert img.size == (32, 32)
+    assert (tmp_path / "copy" / "classes.txt").read_text() == "a\nb\nc"
+
+    # tiling only, 4 tiles of every 64x48 image
+    SubDatasetBuilder(dataset_path).build_subset(
+        tmp_path / "tiles", tiling=TileTransform(32, keep_empty=True)
+    )
+    assert len(list((tmp_path / "tiles" / "images").iterdir())) == 5 * 4
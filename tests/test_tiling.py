@@ -0,0 +1,151 @@
+"""TileTransform geometry"""
+
+import numpy as np
+import pytest
+
+from yolo_dataset_tools.models.yolo import ImageInfo
+from yolo_dataset_tools.transforms import TileTransform
+from yolo_dataset_tools.transforms.base import parse_annotations
+
+
+IMAGE = ImageInfo(width=200, height=200)
+# 45 degree diamond centered in the image, each 100x100 tile gets 1/4
+DIAMOND = "0 0.5 0.0 1.0 0.5 0.5 1.0 0.0 0.5"
+
+
+def _tile_corners(lines):
+    _, coords, _ = parse_annotations(lines)
+    return coords.reshape(-1, 4, 2)
+
+
+def test_diamond_quarters_visibility():
+    kept = TileTransform(100, min_visibility=0.2).split_annotations(
+        [DIAMOND], IMAGE
+    )
+    assert [region for region, _ in kept] == [
+        (0, 0, 100, 100),
+        (100, 0, 200, 100),
+        (0, 100, 100, 200),
+        (100, 100, 200, 200),
+    ]
+    for region, lines in kept:
+        assert len(lines) == 1
+        corners = _tile_corners(lines)[0] * 100
+        # a quarter triangle with legs of 100: the rectangle along its
+        # hypotenuse does not fit the tile, the whole tile is the box
+        np.testing.assert_allclose(
+            np.sort(corners.reshape(-1)),
+            [0, 0, 0, 0, 100, 100, 100, 100],
+            atol=1e-4,
+        )
+
+    dropped = TileTransform(100, min_visibility=0.3).split_annotations(
+        [DIAMOND], IMAGE
+    )
+    assert dropped == []
+
+
+def test_fully_visible_obb_keeps_corners():
+    # rotated square inside the top left tile
+    line = "1 0.25 0.1 0.4 0.25 0.25 0.4 0.1 0.25"
+    tiles = TileTransform(100).split_annotations([line], IMAGE)
+
+    assert len(tiles) == 1
+    region, lines = tiles[0]
+    assert region == (0, 0, 100, 100)
+    assert lines[0].split()[0] == "1"
+    np.testing.assert_allclose(
+        _tile_corners(lines)[0] * 100,
+        [[50, 20], [80, 50], [50, 80], [20, 50]],
+        atol=1e-4,
+    )
+
+
+def test_last_tile_shifted_to_border():
+    regions = TileTransform(100).get_regions(ImageInfo(width=250, height=130))
+    assert regions.tolist() == [
+        [0, 0, 100, 100],
+        [100, 0, 200, 100],
+        [150, 0, 250, 100],
+        [0, 30, 100, 130],
+        [100, 30, 200, 130],
+        [150, 30, 250, 130],
+    ]
+
+
+def test_image_smaller_than_tile():
+    tiler = TileTransform(640)
+    info = ImageInfo(width=300, height=200)
+    assert tiler.get_regions(info).tolist() == [[0, 0, 300, 200]]
+
+    tiles = tiler.split_annotations(["0 0.5 0.5 0.2 0.4"], info)
+    assert len(tiles) == 1
+    region, lines = tiles[0]
+    assert region == (0, 0, 300, 200)
+    _, coords, _ = parse_annotations(lines)
+    np.testing.assert_allclose(coords, [[0.5, 0.5, 0.2, 0.4]], atol=1e-6)
+
+
+def test_box_visibility():
+    # 40x40 box, 3/4 of it in the left tile
+    line = "0 0.45 0.25 0.2 0.2"
+    tiles = TileTransform(100, min_visibility=0.5).split_annotations(
+        [line], IMAGE
+    )
+    assert len(tiles) == 1
+    region, lines = tiles[0]
+    assert region == (0, 0, 100, 100)
+    _, coords, _ = parse_annotations(lines)
+    np.testing.assert_allclose(coords, [[0.85, 0.5, 0.3, 0.4]], atol=1e-6)
+
+
+@pytest.mark.parametrize("annotation_lines", [None, []])
+def test_keep_empty(annotation_lines):
+    kept = TileTransform(100, keep_empty=True).split_annotations(
+        annotation_lines, IMAGE
+    )
+    assert kept == [
+        ((0, 0, 100, 100), []),
+        ((100, 0, 200, 100), []),
+        ((0, 100, 100, 200), []),
+        ((100, 100, 200, 200), []),
+    ]
+
+    dropped = TileTransform(100).split_annotations(annotation_lines, IMAGE)
+    assert dropped == []
+
+
+def test_rotated_boxes_become_obb():
+    # 40x20 box rotated by 90 degrees: 20x40 in pixels
+    line = f"2 0.25 0.25 0.2 0.1 {np.pi / 2}"
+    tiles = TileTransform(100).split_annotations([line], IMAGE)
+
+    assert len(tiles) == 1
+    region, lines = tiles[0]
+    assert region == (0, 0, 100, 100)
+    assert len(lines[0].split()) == 9
+    corners = _tile_corners(lines)[0] * 100
+    np.testing.assert_allclose(corners.min(axis=0), [40, 30], atol=1e-4)
+    np.testing.assert_allclose(corners.max(axis=0), [60, 70], atol=1e-4)
+
+
+def test_rotated_box_clipped_by_polygon():
+    # 45 degrees square, half of its area in each of the top tiles; its
+    # bounding box is 2x larger, visibility of the box would be wrong
+    side = 40 / np.sqrt(2) / 200
+    line = f"0 0.5 0.25 {side} {side} {np.pi / 4}"
+    kept = TileTransform(100, min_visibility=0.5).split_annotations(
+        [line, "1 0.25 0.75 0.1 0.1"], IMAGE
+    )
+    assert [region for region, _ in kept] == [
+        (0, 0, 100, 100),
+        (100, 0, 200, 100),
+        (0, 100, 100, 200),
+    ]
+    # boxes without r are OBB corners too
+    for _, lines in kept:
+        assert all(len(line.split()) == 9 for line in lines)
+    assert (
+        TileTransform(100, min_visibility=0.6).split_annotations([line], IMAGE)
+        == []
+    )
@@ -0,0 +1,98 @@
+"""AnnotationRenderer"""
+
+import pytest
+from PIL import Image
+
+from yolo_dataset_tools import visualizer
+from yolo_dataset_tools.visualizer import AnnotationRenderer
+
+
+class InlineExecutor:
+    """ProcessPoolExecutor replacement, records the rendered tasks"""
+
+    tasks = []
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def map(self, func, tasks, chunksize=1):
+        tasks = list(tasks)
+        InlineExecutor.tasks.extend(tasks)
+        return map(func, tasks)
+
+
+@pytest.fixture
+def rendered_tasks(monkeypatch):
+    InlineExecutor.tasks = []
+    monkeypatch.setattr(visualizer, "ProcessPoolExecutor", InlineExecutor)
+    return InlineExecutor.tasks
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    """images/train/x.jpg with a label, images/val/y.jpg without"""
+
+    for split, stem in (("train", "x"), ("val", "y")):
+        (tmp_path / "images" / split).mkdir(parents=True)
+        Image.new("RGB", (320, 240), (128, 128, 128)).save(
+            tmp_path / "images" / split / f"{stem}.jpg"
+        )
+    (tmp_path / "images" / "train" / "nested").mkdir()
+    (tmp_path / "labels" / "train").mkdir(parents=True)
+    (tmp_path / "labels" / "train" / "x.txt").write_text("0 0.5 0.5 0.5 0.5")
+    # a label with the same stem at the labels root is not used
+    (tmp_path / "labels" / "x.txt").write_text("1 0.5 0.5 0.1 0.1")
+    return tmp_path
+
+
+def test_split_labels(dataset_path, tmp_path, rendered_tasks):
+    renderer = AnnotationRenderer(
+        dataset_path, cache_path=tmp_path / "cache", line_width=4
+    )
+
+    thumbnails = renderer.render()
+
+    assert len(thumbnails) == 2
+    assert [
+        (str(task[0].relative_to(dataset_path)), task[1])
+        for task in rendered_tasks
+    ] == [
+        ("images/train/x.jpg", dataset_path / "labels" / "train" / "x.txt"),
+        ("images/val/y.jpg", None),
+    ]
+    with Image.open(thumbnails[0]) as thumbnail:
+        assert thumbnail.size == (320, 240)
+        # box top edge in the class 0 color
+        red, green, _ = thumbnail.getpixel((160, 60))
+        assert red > 200 and green < 120
+        assert thumbnail.getpixel((160, 120))[0] < 160
+
+    # directories and missing files are skipped
+    assert (
+        renderer.render(["train/nested", "train/missing.jpg", "val/y.jpg"])
+        == thumbnails[1:]
+    )
+
+
+def test_cache_reuse(dataset_path, tmp_path, rendered_tasks):
+    renderer = AnnotationRenderer(dataset_path, cache_path=tmp_path / "cache")
+    thumbnails = renderer.render()
+    assert len(rendered_tasks) == 2
+
+    rendered_tasks.clear()
+    assert renderer.render() == thumbnails
+    assert rendered_tasks == []
+
+    (dataset_path / "labels" / "train" / "x.txt").write_text(
+        "0 0.5 0.5 0.2 0.2"
+    )
+    changed = renderer.render()
+    assert [task[0].name for task in rendered_tasks] == ["x.jpg"]
+    assert changed[0] != thumbnails[0]
+    assert changed[1] == thumbnails[1]